@@ -0,0 +1,196 @@
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables before anything reads settings
+load_dotenv()
+
+def _env_str(name: str, default: Optional[str]) -> Optional[str]:
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+def _env_bool(name: str, default: Optional[bool]) -> Optional[bool]:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def _env_list(name: str, default: Tuple[str, ...]) -> Tuple[str, ...]:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+def _env_pairs(name: str, default: Tuple[Tuple[str, str], ...]) -> Tuple[Tuple[str, str], ...]:
+    """Parse `key=value,key=value` lists."""
+    items = _env_list(name, ())
+    if not items:
+        return default
+    return tuple(tuple(part.strip() for part in item.split("=", 1)) for item in items if "=" in item)
+
+@dataclass(frozen=True)
+class Settings:
+    """Application settings, read from the environment (and `.env`)."""
+
+    mongodb_url: str = "mongodb://localhost:27017"
+    mongodb_db: str = "hadir"
+
+    # Connection pool
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: int = 5000
+    connect_timeout_ms: int = 20000
+    # e.g. ("zstd", "snappy", "zlib"); zstd and snappy need their python modules
+    compressors: Tuple[str, ...] = ()
+
+    # None lets the URL decide (mongodb+srv:// implies TLS)
+    tls: Optional[bool] = None
+    tls_insecure: bool = False
+
+    # Workers do not build indexes unless asked; deploys run `python -m app.indexes apply`
+    ensure_indexes_on_startup: bool = False
+    # How long /readyz waits for Mongo to answer a ping
+    readiness_timeout_ms: int = 2000
+
+    # Read routing for read-only list endpoints; writes always use the primary.
+    # Listings read the primary by default, so a booking shows up as soon as
+    # it is created. "secondaryPreferred" offloads them to secondaries, for
+    # deployments that accept listings lagging a write by the replication delay.
+    list_read_preference: str = "primary"
+    list_read_concern: str = "local"
+
+    # Process-local document caches
+    business_cache_size: int = 1024
+    business_cache_ttl: float = 300
+    service_cache_size: int = 4096
+    service_cache_ttl: float = 300
+    customer_cache_size: int = 10000
+    customer_cache_ttl: float = 300
+    # Evict cache entries on writes by any worker via a change stream (needs a replica set)
+    cache_change_streams: bool = True
+    # Provider message ids seen recently, so webhook retries skip Mongo entirely
+    delivery_cache_size: int = 10000
+    delivery_cache_ttl: float = 600
+
+    # Logging: root level, per-logger overrides such as (("app.routes", "DEBUG"),)
+    # and the fraction of DEBUG records kept
+    log_level: str = "INFO"
+    log_levels: Tuple[Tuple[str, str], ...] = ()
+    log_debug_sample_rate: float = 0.1
+    log_format: str = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+    # Server-side time limit for search queries
+    search_max_time_ms: int = 2000
+    # Message search covers the last `search_window_days` unless a window is
+    # given; wider windows than `search_max_window_days` are refused
+    search_window_days: int = 30
+    search_max_window_days: int = 92
+
+    # Most recent messages kept on each conversation for building prompts
+    context_messages: int = 10
+
+    # Message appends: "sync" writes each message on its own; "group" batches
+    # concurrent appends and answers once the batch is written; "buffered"
+    # answers once queued (messages still queued are lost if the process dies)
+    message_write_mode: str = "sync"
+    message_queue_size: int = 10000
+    message_batch_size: int = 500
+    message_flush_ms: float = 5
+
+    # Background booking sweeps (one worker runs them, via a lease in Mongo)
+    scheduler_enabled: bool = True
+    scheduler_interval_seconds: float = 60
+    sweep_batch_size: int = 500
+    reminder_lead_minutes: int = 24 * 60
+    no_show_after_minutes: int = 30
+    complete_after_minutes: int = 30
+
+    # Add a Server-Timing header (total and Mongo time) to every response
+    metrics_server_timing: bool = False
+    # Also count BSON bytes of every command and reply; this re-encodes each
+    # one, so it is for profiling sessions rather than production
+    metrics_command_bytes: bool = False
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        defaults = cls()
+        return cls(
+            mongodb_url=_env_str("MONGODB_URL", defaults.mongodb_url),
+            mongodb_db=_env_str("MONGODB_DB", defaults.mongodb_db),
+            max_pool_size=_env_int("MONGODB_MAX_POOL_SIZE", defaults.max_pool_size),
+            min_pool_size=_env_int("MONGODB_MIN_POOL_SIZE", defaults.min_pool_size),
+            max_idle_time_ms=_env_int("MONGODB_MAX_IDLE_TIME_MS", defaults.max_idle_time_ms),
+            wait_queue_timeout_ms=_env_int("MONGODB_WAIT_QUEUE_TIMEOUT_MS", defaults.wait_queue_timeout_ms),
+            server_selection_timeout_ms=_env_int("MONGODB_SERVER_SELECTION_TIMEOUT_MS", defaults.server_selection_timeout_ms),
+            connect_timeout_ms=_env_int("MONGODB_CONNECT_TIMEOUT_MS", defaults.connect_timeout_ms),
+            compressors=_env_list("MONGODB_COMPRESSORS", defaults.compressors),
+            tls=_env_bool("MONGODB_TLS", defaults.tls),
+            tls_insecure=_env_bool("MONGODB_TLS_INSECURE", defaults.tls_insecure),
+            ensure_indexes_on_startup=_env_bool("MONGODB_ENSURE_INDEXES", defaults.ensure_indexes_on_startup),
+            readiness_timeout_ms=_env_int("READINESS_TIMEOUT_MS", defaults.readiness_timeout_ms),
+            list_read_preference=_env_str("MONGODB_LIST_READ_PREFERENCE", defaults.list_read_preference),
+            list_read_concern=_env_str("MONGODB_LIST_READ_CONCERN", defaults.list_read_concern),
+            business_cache_size=_env_int("BUSINESS_CACHE_SIZE", defaults.business_cache_size),
+            business_cache_ttl=_env_float("BUSINESS_CACHE_TTL", defaults.business_cache_ttl),
+            service_cache_size=_env_int("SERVICE_CACHE_SIZE", defaults.service_cache_size),
+            service_cache_ttl=_env_float("SERVICE_CACHE_TTL", defaults.service_cache_ttl),
+            customer_cache_size=_env_int("CUSTOMER_CACHE_SIZE", defaults.customer_cache_size),
+            customer_cache_ttl=_env_float("CUSTOMER_CACHE_TTL", defaults.customer_cache_ttl),
+            cache_change_streams=_env_bool("CACHE_CHANGE_STREAMS", defaults.cache_change_streams),
+            delivery_cache_size=_env_int("DELIVERY_CACHE_SIZE", defaults.delivery_cache_size),
+            delivery_cache_ttl=_env_float("DELIVERY_CACHE_TTL", defaults.delivery_cache_ttl),
+            log_level=_env_str("LOG_LEVEL", defaults.log_level).upper(),
+            log_levels=tuple((name, level.upper()) for name, level in _env_pairs("LOG_LEVELS", defaults.log_levels)),
+            log_debug_sample_rate=_env_float("LOG_DEBUG_SAMPLE_RATE", defaults.log_debug_sample_rate),
+            log_format=_env_str("LOG_FORMAT", defaults.log_format),
+            search_max_time_ms=_env_int("SEARCH_MAX_TIME_MS", defaults.search_max_time_ms),
+            search_window_days=_env_int("SEARCH_WINDOW_DAYS", defaults.search_window_days),
+            search_max_window_days=_env_int("SEARCH_MAX_WINDOW_DAYS", defaults.search_max_window_days),
+            context_messages=_env_int("CONTEXT_MESSAGES", defaults.context_messages),
+            message_write_mode=_env_str("MESSAGE_WRITE_MODE", defaults.message_write_mode),
+            message_queue_size=_env_int("MESSAGE_QUEUE_SIZE", defaults.message_queue_size),
+            message_batch_size=_env_int("MESSAGE_BATCH_SIZE", defaults.message_batch_size),
+            message_flush_ms=_env_float("MESSAGE_FLUSH_MS", defaults.message_flush_ms),
+            scheduler_enabled=_env_bool("SCHEDULER_ENABLED", defaults.scheduler_enabled),
+            scheduler_interval_seconds=_env_float("SCHEDULER_INTERVAL_SECONDS", defaults.scheduler_interval_seconds),
+            sweep_batch_size=_env_int("SWEEP_BATCH_SIZE", defaults.sweep_batch_size),
+            reminder_lead_minutes=_env_int("REMINDER_LEAD_MINUTES", defaults.reminder_lead_minutes),
+            no_show_after_minutes=_env_int("NO_SHOW_AFTER_MINUTES", defaults.no_show_after_minutes),
+            complete_after_minutes=_env_int("COMPLETE_AFTER_MINUTES", defaults.complete_after_minutes),
+            metrics_server_timing=_env_bool("METRICS_SERVER_TIMING", defaults.metrics_server_timing),
+            metrics_command_bytes=_env_bool("METRICS_COMMAND_BYTES", defaults.metrics_command_bytes),
+        )
+
+    def client_options(self) -> dict:
+        """Keyword arguments for AsyncIOMotorClient."""
+        options = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+        }
+        if self.max_idle_time_ms is not None:
+            options["maxIdleTimeMS"] = self.max_idle_time_ms
+        if self.wait_queue_timeout_ms is not None:
+            options["waitQueueTimeoutMS"] = self.wait_queue_timeout_ms
+        if self.compressors:
+            options["compressors"] = ",".join(self.compressors)
+        if self.tls is not None:
+            options["tls"] = self.tls
+        if self.tls_insecure:
+            options["tlsInsecure"] = True
+        return options
+
+settings = Settings.from_env()
@@ -1,69 +1,95 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from typing import Dict, Optional, Tuple
+import logging
+
+from app.config import settings
+from app.logic.metrics import command_listener
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": Primary(),
+    "primaryPreferred": PrimaryPreferred(),
+    "secondary": Secondary(),
+    "secondaryPreferred": SecondaryPreferred(),
+    "nearest": Nearest(),
+}
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
     db = None
+    _collections: Dict[Tuple[str, str], object] = {}
 
     @classmethod
-    async def connect_db(cls, mongodb_url: str):
-        try:
-            # Connect with minimal configuration
+    def connect(cls, mongodb_url: Optional[str] = None):
+        """Create the client if needed and return the database.
+
+        No I/O happens here: the driver discovers the servers in the
+        background and connects on the first operation, so workers boot
+        without waiting for Mongo. Index builds are a separate step
+        (`python -m app.indexes apply`).
+        """
+        if cls.client is None:
+            # Pool, timeout, compression and TLS options come from app.config
             cls.client = AsyncIOMotorClient(
-                mongodb_url,
-                serverSelectionTimeoutMS=5000,
-                tls=True,
-                tlsInsecure=True
+                mongodb_url or settings.mongodb_url,
+                event_listeners=[command_listener],
+                **settings.client_options()
             )
-            
-            # Test the connection
-            await cls.client.admin.command('ping')
-            print("Successfully connected to MongoDB!")
-            
-            cls.db = cls.client.hadir
-            
-            # Create indexes
-            await cls._init_indexes()
-            
-        except Exception as e:
-            print(f"Failed to connect to MongoDB: {e}")
-            raise e
+            cls.db = cls.client[settings.mongodb_db]
+            cls._collections = {}
+        return cls.db
 
     @classmethod
-    async def _init_indexes(cls):
-        # Business indexes
-        await cls.db.businesses.create_index("whatsapp_number", unique=True)
-        
-        # Service indexes
-        await cls.db.services.create_index("business_id")
-        
-        # Booking indexes
-        await cls.db.bookings.create_index("business_id")
-        await cls.db.bookings.create_index("start_time")
-        await cls.db.bookings.create_index([
-            ("business_id", 1),
-            ("start_time", 1),
-            ("end_time", 1)
-        ])
+    def database(cls):
+        return cls.db if cls.db is not None else cls.connect()
 
-        # Customer indexes
-        await cls.db.customers.create_index("whatsapp_id", unique=True)
-        await cls.db.customers.create_index("phone")
+    @classmethod
+    async def ping(cls) -> None:
+        await cls.database().command("ping")
 
-        # Conversation indexes
-        await cls.db.conversations.create_index([
-            ("business_id", 1),
-            ("customer_id", 1)
-        ], unique=True)
-        await cls.db.conversations.create_index("business_id")
+    @classmethod
+    async def connect_db(cls, mongodb_url: Optional[str] = None):
+        """Connect and check that the server answers (for CLIs and scripts)."""
+        cls.connect(mongodb_url)
+        try:
+            await cls.ping()
+            logger.info("Successfully connected to MongoDB")
+        except Exception as e:
+            logger.error("Failed to connect to MongoDB: %s", e)
+            raise e
 
     @classmethod
     async def close_db(cls):
         if cls.client:
             cls.client.close()
+        cls.client = None
+        cls.db = None
+        cls._collections = {}
 
     @classmethod
-    def get_collection(cls, collection_name: str):
-        return cls.db[collection_name]
+    def get_collection(cls, collection_name: str, read_profile: str = "primary"):
+        """Get a collection, optionally routed for reads.
+
+        `read_profile="list"` applies the configured list read preference and
+        read concern, so read-only listings can opt into being served by
+        secondaries (MONGODB_LIST_READ_PREFERENCE).
+        Anything that feeds a write decision must keep the primary default.
+        """
+        database = cls.database()
+        if read_profile == "primary":
+            return database[collection_name]
+        key = (collection_name, read_profile)
+        collection = cls._collections.get(key)
+        if collection is None:
+            collection = database.get_collection(
+                collection_name,
+                read_preference=READ_PREFERENCES[settings.list_read_preference],
+                read_concern=ReadConcern(settings.list_read_concern)
+            )
+            cls._collections[key] = collection
+        return collection
 
 db = Database()
@@ -0,0 +1,311 @@
+"""Declarative index registry derived from the application's query shapes.
+
+Every index names the queries it serves, and every query shape the
+application issues is listed in QUERY_SHAPES so it can be checked with
+`explain()`:
+
+    python -m app.indexes apply [--drop-obsolete]
+    python -m app.indexes audit
+
+`audit` exits non-zero when any query shape is planned with a COLLSCAN or
+an in-memory SORT. The one accepted SORT is a top-k sort over a shape whose
+`bounded_by` field is a required, capped range, so it never sees more than
+one window's matches and holds at most `limit` of them.
+
+Workers do not build indexes when they start; run `apply` as a deploy step
+(or set MONGODB_ENSURE_INDEXES=1 for local development). On a database
+with no bookings, services or slot locks yet, `apply` also records the
+object_ids migration as completed, so a fresh install never reads foreign
+keys in their legacy string form.
+"""
+import argparse
+import asyncio
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: Tuple[Tuple[str, Any], ...]
+    serves: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    # An index this one replaces that cannot coexist with it (a collection
+    # has at most one text index); ensure_indexes drops it first
+    replaces: Optional[str] = None
+
+@dataclass(frozen=True)
+class QueryShape:
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[Dict[str, int]] = None
+    projection: Optional[Dict[str, int]] = None
+    collation: Optional[Dict[str, Any]] = None
+    limit: Optional[int] = None
+    # Filter field whose range bounds the documents an in-memory SORT sees
+    bounded_by: Optional[str] = None
+
+# Case- and accent-insensitive; name searches must pass the same collation to use the index
+NAME_COLLATION = {"locale": "en", "strength": 1}
+
+INDEXES: List[IndexSpec] = [
+    # Businesses
+    IndexSpec("businesses", (("whatsapp_number", 1),), "business lookup by WhatsApp number", {"unique": True}),
+    IndexSpec("businesses", (("name", 1),), "create_business upsert by name"),
+    IndexSpec("businesses", (("track_check_ins", 1),), "no-show and completion sweeps"),
+
+    # Services
+    IndexSpec("services", (("business_id", 1),), "get_services"),
+
+    # Bookings
+    IndexSpec(
+        "bookings",
+        (("business_id", 1), ("status", 1), ("start_time", 1), ("end_time", 1)),
+        "overlap_exists, load_slot_index, calendar"
+    ),
+    IndexSpec("bookings", (("business_id", 1), ("start_time", 1), ("_id", 1)), "list_bookings pages"),
+    IndexSpec(
+        "bookings",
+        (("business_id", 1), ("customer_id", 1), ("status", 1), ("start_time", 1)),
+        "refresh_next_booking"
+    ),
+    IndexSpec("bookings", (("status", 1), ("start_time", 1)), "reminder and no-show sweeps"),
+    IndexSpec("bookings", (("status", 1), ("end_time", 1)), "completion sweep"),
+
+    # Outbound messages queued by the sweeps; one per booking and kind
+    IndexSpec("outbox", (("booking_id", 1), ("kind", 1)), "queue_reminders", {"unique": True}),
+
+    # Slot locks: one document per (business, cell); expire once the reserved time has passed
+    IndexSpec("slot_locks", (("business_id", 1), ("cell", 1)), "reserve_slot", {"unique": True}),
+    IndexSpec("slot_locks", (("booking_id", 1),), "release_slot"),
+    IndexSpec("slot_locks", (("expires_at", 1),), "TTL expiry", {"expireAfterSeconds": 0}),
+
+    # Customers
+    IndexSpec("customers", (("whatsapp_id", 1),), "customer upsert and lookup", {"unique": True}),
+    IndexSpec("customers", (("phone", 1),), "customer lookup by phone"),
+    IndexSpec("customers", (("created_at", -1),), "list_customers"),
+    IndexSpec("customers", (("phone_normalized", 1), ("_id", 1)), "customer search by phone prefix"),
+    IndexSpec(
+        "customers", (("name", 1), ("_id", 1)), "customer search by name prefix",
+        {"collation": NAME_COLLATION}
+    ),
+
+    # Conversations
+    IndexSpec(
+        "conversations",
+        (("business_id", 1), ("customer_id", 1)),
+        "get_conversation_page, add_message, get_business_conversations",
+        {"unique": True}
+    ),
+
+    # Messages
+    IndexSpec(
+        "messages", (("business_id", 1), ("customer_id", 1), ("ts", 1), ("_id", 1)), "message history and pages"
+    ),
+    IndexSpec(
+        "messages",
+        (("business_id", 1), ("provider_message_id", 1)),
+        "add_message deduplication of provider retries",
+        {"unique": True, "partialFilterExpression": {"provider_message_id": {"$type": "string"}}}
+    ),
+    # "none": no stemming or stop words, so Arabic and English tokenise alike;
+    # the ts suffix applies the search window while scanning index entries
+    IndexSpec(
+        "messages", (("business_id", 1), ("text", "text"), ("ts", -1)), "message search",
+        {"default_language": "none"}, replaces="business_id_1_text_text"
+    ),
+]
+
+# Indexes created by earlier versions that are covered by the registry above
+OBSOLETE_INDEXES: List[Tuple[str, str]] = [
+    ("bookings", "business_id_1"),
+    ("bookings", "start_time_1"),
+    ("bookings", "business_id_1_start_time_1_end_time_1"),
+    ("bookings", "business_id_1_start_time_1"),
+    ("conversations", "business_id_1"),
+    ("messages", "business_id_1_customer_id_1_ts_1"),
+]
+
+_oid = ObjectId("000000000000000000000000")
+_legacy = {"$in": [_oid, str(_oid)]}
+_now = datetime(2025, 1, 1)
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("business by id", "businesses", {"_id": _oid}),
+    QueryShape("business by name", "businesses", {"name": "x"}),
+    QueryShape("business by whatsapp_number", "businesses", {"whatsapp_number": "+971500000000"}),
+    QueryShape("businesses tracking check-ins", "businesses", {"track_check_ins": True}, projection={"_id": 1}),
+    QueryShape("service by id", "services", {"_id": _oid}),
+    QueryShape("services of business", "services", {"business_id": _oid}),
+    QueryShape(
+        "overlap_exists", "bookings",
+        {"business_id": _oid, "status": "confirmed", "start_time": {"$lt": _now}, "end_time": {"$gt": _now}}
+    ),
+    QueryShape(
+        "list_bookings", "bookings",
+        {"business_id": _oid, "start_time": {"$gte": _now, "$lt": _now}},
+        sort={"start_time": 1, "_id": 1}
+    ),
+    # While the object_ids migration runs, foreign keys match either stored form
+    QueryShape(
+        "overlap_exists (legacy ids)", "bookings",
+        {"business_id": _legacy, "status": "confirmed", "start_time": {"$lt": _now}, "end_time": {"$gt": _now}}
+    ),
+    QueryShape(
+        "list_bookings (legacy ids)", "bookings",
+        {"business_id": _legacy, "start_time": {"$gte": _now, "$lt": _now}},
+        sort={"start_time": 1, "_id": 1}
+    ),
+    QueryShape(
+        "calendar", "bookings",
+        {"business_id": _oid, "status": {"$in": ["confirmed"]}, "start_time": {"$gte": _now, "$lt": _now}}
+    ),
+    QueryShape(
+        "next booking", "bookings",
+        {"business_id": _oid, "customer_id": _oid, "status": "confirmed", "start_time": {"$gte": _now}},
+        sort={"start_time": 1}
+    ),
+    QueryShape(
+        "next booking (legacy ids)", "bookings",
+        {"business_id": _legacy, "customer_id": _legacy, "status": "confirmed", "start_time": {"$gte": _now}},
+        sort={"start_time": 1}
+    ),
+    QueryShape(
+        "reminder sweep", "bookings",
+        {"status": "confirmed", "start_time": {"$gt": _now, "$lte": _now}, "reminder_queued_at": None},
+        sort={"start_time": 1}
+    ),
+    QueryShape(
+        "no-show sweep", "bookings",
+        {"status": "confirmed", "start_time": {"$lte": _now}, "business_id": {"$in": [_oid]}, "checked_in_at": None},
+        sort={"start_time": 1}
+    ),
+    QueryShape(
+        "completion sweep", "bookings",
+        {"status": "confirmed", "end_time": {"$lte": _now}}, sort={"end_time": 1}
+    ),
+    QueryShape("slot lock cell", "slot_locks", {"business_id": _oid, "cell": _now}),
+    QueryShape("release_slot", "slot_locks", {"booking_id": _oid}),
+    QueryShape("customer by whatsapp_id", "customers", {"whatsapp_id": "x"}),
+    QueryShape("list_customers", "customers", {}, sort={"created_at": -1}),
+    QueryShape(
+        "customer search by phone", "customers",
+        {"phone_normalized": {"$regex": "^971"}}, sort={"phone_normalized": 1, "_id": 1}
+    ),
+    QueryShape(
+        "customer search by name", "customers",
+        {"name": {"$gte": "al", "$lt": "al\uffff"}}, sort={"name": 1, "_id": 1}, collation=NAME_COLLATION
+    ),
+    QueryShape("conversation", "conversations", {"business_id": _oid, "customer_id": _oid}),
+    QueryShape("conversations of business", "conversations", {"business_id": _oid}),
+    QueryShape(
+        "message page", "messages",
+        {"business_id": _oid, "customer_id": _oid, "ts": {"$lt": _now}}, sort={"ts": -1, "_id": -1}
+    ),
+    QueryShape(
+        "message page after cursor", "messages",
+        {"$and": [
+            {"business_id": _oid, "customer_id": _oid},
+            {"$or": [{"ts": {"$lt": _now}}, {"ts": _now, "_id": {"$lt": _oid}}]}
+        ]},
+        sort={"ts": -1, "_id": -1}
+    ),
+    QueryShape("messages of conversations", "messages", {"business_id": _oid, "customer_id": {"$in": [_oid]}}),
+    QueryShape("message by provider id", "messages", {"business_id": _oid, "provider_message_id": "x"}),
+    # A text index cannot return entries in ts order, so matches inside the
+    # required search window are top-k sorted in memory
+    QueryShape(
+        "message search", "messages",
+        {"business_id": _oid, "$text": {"$search": "x"}, "ts": {"$gte": _now, "$lt": _now}},
+        sort={"ts": -1, "_id": -1}, limit=21, bounded_by="ts"
+    ),
+]
+
+async def ensure_indexes(database) -> None:
+    for spec in INDEXES:
+        collection = database[spec.collection]
+        if spec.replaces and spec.replaces in await collection.index_information():
+            await collection.drop_index(spec.replaces)
+        await collection.create_index(list(spec.keys), **spec.options)
+
+async def drop_obsolete_indexes(database) -> List[str]:
+    dropped = []
+    for collection, name in OBSOLETE_INDEXES:
+        existing = await database[collection].index_information()
+        if name in existing:
+            await database[collection].drop_index(name)
+            dropped.append(f"{collection}.{name}")
+    return dropped
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+def _bounded(shape: QueryShape) -> bool:
+    """Whether an in-memory SORT of the shape is a top-k sort over a closed range."""
+    bound = shape.filter.get(shape.bounded_by) if shape.bounded_by else None
+    return bool(shape.limit and isinstance(bound, dict) and "$gte" in bound and "$lt" in bound)
+
+async def explain_shape(database, shape: QueryShape) -> List[str]:
+    """Return the problematic stages (COLLSCAN, in-memory SORT) in a shape's winning plan."""
+    command = {"find": shape.collection, "filter": shape.filter}
+    if shape.sort:
+        command["sort"] = shape.sort
+    if shape.projection:
+        command["projection"] = shape.projection
+    if shape.collation:
+        command["collation"] = shape.collation
+    if shape.limit:
+        command["limit"] = shape.limit
+    result = await database.command("explain", command, verbosity="queryPlanner")
+    winning = result["queryPlanner"]["winningPlan"]
+    # Plans chosen by the slot-based engine nest the classic plan under queryPlan
+    winning = winning.get("queryPlan", winning)
+    bad = ("COLLSCAN",) if _bounded(shape) else ("COLLSCAN", "SORT")
+    return [stage for stage in _stages(winning) if stage in bad]
+
+async def audit(database) -> Dict[str, List[str]]:
+    failures = {}
+    for shape in QUERY_SHAPES:
+        bad = await explain_shape(database, shape)
+        if bad:
+            failures[shape.name] = bad
+    return failures
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["apply", "audit"])
+    parser.add_argument("--drop-obsolete", action="store_true")
+    args = parser.parse_args()
+
+    from app.db import db
+    from app.migrations.object_ids import complete_if_empty
+    await db.connect_db()
+    try:
+        if args.command == "apply":
+            await ensure_indexes(db.db)
+            if args.drop_obsolete:
+                for name in await drop_obsolete_indexes(db.db):
+                    print(f"Dropped {name}")
+            print(f"Ensured {len(INDEXES)} indexes")
+            if await complete_if_empty():
+                print("Empty database: recorded the object_ids migration as completed")
+        else:
+            failures = await audit(db.db)
+            for name, stages in failures.items():
+                print(f"{name}: {', '.join(stages)}")
+            print(f"{len(QUERY_SHAPES) - len(failures)}/{len(QUERY_SHAPES)} query shapes use an index")
+            if failures:
+                sys.exit(1)
+    finally:
+        await db.close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
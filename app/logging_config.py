@@ -0,0 +1,85 @@
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional, Tuple
+
+from app.config import Settings
+
+class SamplingFilter(logging.Filter):
+    """Let through only a fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+class LazyQueueHandler(QueueHandler):
+    """Hand records to the background listener without formatting them.
+
+    Only `msg % args` is resolved on the calling thread, so later mutation of
+    the arguments cannot change the message; timestamps, formatting and the
+    actual write happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[LazyQueueHandler] = None
+# Root handlers and level from before setup_logging, put back by stop_logging
+_previous: Optional[Tuple[List[logging.Handler], int]] = None
+
+def setup_logging(settings: Settings) -> None:
+    """Route all logging through a queue drained by a background writer thread.
+
+    Calling it again while the writer runs does nothing, so it can run both
+    at import and at the start of every lifespan.
+    """
+    global _listener, _handler, _previous
+    if _listener is not None:
+        return
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter(settings.log_format))
+
+    _handler = LazyQueueHandler(records)
+    _handler.addFilter(SamplingFilter(settings.log_debug_sample_rate))
+
+    root = logging.getLogger()
+    _previous = (root.handlers, root.level)
+    root.handlers = [_handler]
+    root.setLevel(settings.log_level)
+    for name, level in settings.log_levels:
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+
+def stop_logging() -> None:
+    """Flush queued records, stop the writer thread and restore the previous root handlers.
+
+    Records logged afterwards go to those handlers instead of a queue nobody drains.
+    """
+    global _listener, _handler, _previous
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+        _handler = None
+    if _previous is not None:
+        handlers, level = _previous
+        # Handlers added since setup (e.g. by a test harness) stay
+        for handler in handlers:
+            if handler not in root.handlers:
+                root.addHandler(handler)
+        root.setLevel(level)
+        _previous = None
@@ -0,0 +1,132 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Tuple
+
+from app.db import db
+from app.logic.legacy_ids import match_id
+from app.logic.schedule import get_schedule
+
+Interval = Tuple[datetime, datetime]
+
+# Granularity of the slot-lock documents used to reserve booking time atomically
+SLOT_CELL_MINUTES = 5
+SLOT_CELL = timedelta(minutes=SLOT_CELL_MINUTES)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def as_utc(dt: datetime) -> datetime:
+    """Normalise naive (Mongo) and aware datetimes to aware UTC."""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+def cell_floor(dt: datetime) -> datetime:
+    return EPOCH + ((as_utc(dt) - EPOCH) // SLOT_CELL) * SLOT_CELL
+
+def cell_ceil(dt: datetime) -> datetime:
+    floor = cell_floor(dt)
+    return floor if floor == as_utc(dt) else floor + SLOT_CELL
+
+def busy_interval(start: datetime, end: datetime, buffer: timedelta) -> Interval:
+    """Interval a booking blocks for new starts, matching its slot locks.
+
+    A booking locks the cells covering [start, end + buffer), so a new
+    booking [s, e) is only reservable when its own cells miss those: when
+    s >= ceil(end + buffer) or e + buffer <= floor(start). With unaligned
+    times this is up to one cell stricter than the exact minutes, e.g. a
+    09:02-09:32 booking keeps 09:32 busy until 09:35.
+    """
+    return cell_floor(start) - buffer, cell_ceil(end + buffer)
+
+class SlotIndex:
+    """Sorted, merged busy intervals of one business.
+
+    Intervals are kept disjoint, so both the start and end lists stay sorted
+    and every lookup is a binary search.
+    """
+
+    def __init__(self, intervals: List[Interval] = ()):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        for start, end in sorted(intervals):
+            if self._ends and start <= self._ends[-1]:
+                if end > self._ends[-1]:
+                    self._ends[-1] = end
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        # First busy interval that ends after `start` is the only candidate
+        i = bisect_right(self._ends, start)
+        return i == len(self._starts) or self._starts[i] >= end
+
+    def add(self, start: datetime, end: datetime) -> None:
+        lo = bisect_left(self._ends, start)
+        hi = bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+    def gaps(self, start: datetime, end: datetime) -> Iterator[Interval]:
+        """Yield the free sub-intervals of [start, end)."""
+        i = bisect_right(self._ends, start)
+        cursor = start
+        while cursor < end:
+            if i == len(self._starts) or self._starts[i] >= end:
+                yield cursor, end
+                return
+            if self._starts[i] > cursor:
+                yield cursor, self._starts[i]
+            cursor = max(cursor, self._ends[i])
+            i += 1
+
+async def load_slot_index(business_id: str, window_start: datetime, window_end: datetime, buffer_minutes: int = 0) -> SlotIndex:
+    """Build a SlotIndex from the confirmed bookings touching the window, in one query."""
+    buffer = timedelta(minutes=buffer_minutes)
+    cursor = db.get_collection("bookings").find(
+        {
+            "business_id": await match_id(business_id),
+            "status": "confirmed",
+            "start_time": {"$lt": window_end + buffer},
+            "end_time": {"$gt": window_start - buffer},
+        },
+        {"start_time": 1, "end_time": 1, "_id": 0},
+    )
+    intervals = [busy_interval(b["start_time"], b["end_time"], buffer) async for b in cursor]
+    return SlotIndex(intervals)
+
+def working_intervals(window_start: datetime, window_end: datetime, tz_str: str, working_hours: list) -> List[Interval]:
+    """Working hours overlapping the window, converted to UTC and sorted.
+
+    Intervals end at the window end but keep their real start, which
+    free_slots aligns candidates to.
+    """
+    return get_schedule(working_hours, tz_str).utc_intervals(window_start, window_end, clip_start=False)
+
+def free_slots(index: SlotIndex, work: List[Interval], duration_minutes: int, step_minutes: int,
+               limit: int = None, not_before: datetime = None) -> List[Interval]:
+    """Sweep working intervals against the busy index and return open slots.
+
+    Candidate starts are aligned to `step_minutes` from the beginning of each
+    working interval, and none starts before `not_before` (the window start),
+    so a window opening at 10:07:33 still yields 10:15, 10:30, ...
+    """
+    duration = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=step_minutes)
+    slots = []
+    for work_start, work_end in work:
+        lower = max(work_start, not_before) if not_before else work_start
+        for gap_start, gap_end in index.gaps(lower, work_end):
+            steps = -((work_start - gap_start) // step)  # ceil division
+            candidate = work_start + steps * step
+            while candidate + duration <= gap_end:
+                slots.append((candidate, candidate + duration))
+                if limit and len(slots) >= limit:
+                    return slots
+                candidate += step
+    return slots
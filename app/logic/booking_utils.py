@@ -1,61 +1,114 @@
-from datetime import datetime, timedelta, time
-import pytz
+from datetime import datetime, timedelta
+from typing import List
+from cachetools import TTLCache
+from app.config import settings
 from app.db import db
+from app.logic.availability import SLOT_CELL, as_utc, cell_floor
+from app.logic.cache import business_cache, service_cache
+from app.logic.legacy_ids import match_id
+from app.logic.schedule import get_schedule, get_timezone
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 
-async def get_service_duration(service_id: str) -> int:
-    svc = await db.get_collection("services").find_one({"_id": ObjectId(service_id)})
+async def get_service(service_id: str) -> dict:
+    oid = ObjectId(service_id)
+    svc = await service_cache.get(
+        oid, lambda: db.get_collection("services").find_one({"_id": oid})
+    )
     if not svc:
         raise ValueError("Service not found")
+    return svc
+
+async def get_service_duration(service_id: str) -> int:
+    svc = await get_service(service_id)
     return svc["duration_minutes"]
 
 async def get_business(business_id: str):
-    biz = await db.get_collection("businesses").find_one({"_id": ObjectId(business_id)})
+    oid = ObjectId(business_id)
+    biz = await business_cache.get(
+        oid, lambda: db.get_collection("businesses").find_one({"_id": oid})
+    )
+    if not biz:
+        raise ValueError("Business not found")
+    return biz
+
+# whatsapp_number -> business _id, checked against the cached business on use
+business_ids = TTLCache(maxsize=settings.business_cache_size, ttl=settings.business_cache_ttl)
+
+async def get_business_by_number(whatsapp_number: str) -> dict:
+    oid = business_ids.get(whatsapp_number)
+    if oid is not None:
+        try:
+            biz = await get_business(str(oid))
+            if biz.get("whatsapp_number") == whatsapp_number:
+                return biz
+        except ValueError:
+            pass
+        business_ids.pop(whatsapp_number, None)
+
+    biz = await db.get_collection("businesses").find_one({"whatsapp_number": whatsapp_number})
     if not biz:
         raise ValueError("Business not found")
+    business_ids[whatsapp_number] = biz["_id"]
+    business_cache.put(biz["_id"], biz)
     return biz
 
 def to_local(dt_utc: datetime, tz_str: str) -> datetime:
-    tz = pytz.timezone(tz_str)
-    if dt_utc.tzinfo is None:
-        dt_utc = pytz.UTC.localize(dt_utc)
-    return dt_utc.astimezone(tz)
+    return as_utc(dt_utc).astimezone(get_timezone(tz_str))
 
 def within_working_hours(start_local: datetime, end_local: datetime, working_hours: list) -> bool:
-    day = start_local.weekday()
-    print(f"Checking day {day} for time {start_local.strftime('%H:%M')} - {end_local.strftime('%H:%M')}")
-    
-    # working_hours: list of dicts with 'day', 'start', 'end'
-    slots = [w for w in working_hours if w["day"] == day]
-    if not slots:
-        print(f"No working hours found for day {day}")
-        return False
-        
-    slot = slots[0]
-    print(f"Found slot: {slot['start']} - {slot['end']}")
-    
-    # Create timezone-aware datetime objects for comparison
-    tz = start_local.tzinfo
-    start_work = datetime.combine(start_local.date(), time.fromisoformat(slot["start"]))
-    end_work = datetime.combine(start_local.date(), time.fromisoformat(slot["end"]))
-    
-    # Make the times timezone-aware
-    start_work = tz.localize(start_work)
-    end_work = tz.localize(end_work)
-    
-    print(f"Comparing: {start_work.strftime('%H:%M')} <= {start_local.strftime('%H:%M')} and {end_local.strftime('%H:%M')} <= {end_work.strftime('%H:%M')}")
-    
-    is_within = start_work <= start_local and end_local <= end_work
-    print(f"Result: {is_within}")
-    return is_within
+    # working_hours: list of dicts with 'day', 'start', 'end'; compiled once per distinct value
+    return get_schedule(working_hours).contains(start_local, end_local)
 
 async def overlap_exists(business_id: str, window_start: datetime, window_end: datetime) -> bool:
     query = {
-        "business_id": business_id,
+        "business_id": await match_id(business_id),
         "status": "confirmed",
         "$or": [
             {"start_time": {"$lt": window_end}, "end_time": {"$gt": window_start}}
         ]
     }
     count = await db.get_collection("bookings").count_documents(query)
-    return count > 0 
\ No newline at end of file
+    return count > 0 
+
+def slot_cells(start: datetime, end: datetime) -> List[datetime]:
+    """Start times of the fixed-size cells covering [start, end)."""
+    end = as_utc(end)
+    current = cell_floor(start)
+    cells = []
+    while current < end:
+        cells.append(current)
+        current += SLOT_CELL
+    return cells
+
+def slot_lock_docs(business_id: str, booking_id: ObjectId, start: datetime, end: datetime, buffer_minutes: int = 0) -> List[dict]:
+    expires_at = as_utc(end) + timedelta(minutes=buffer_minutes)
+    return [
+        {"business_id": ObjectId(business_id), "cell": cell, "booking_id": booking_id, "expires_at": expires_at}
+        for cell in slot_cells(start, expires_at)
+    ]
+
+async def reserve_slot(business_id: str, booking_id: ObjectId, start: datetime, end: datetime, buffer_minutes: int = 0) -> bool:
+    """Atomically claim [start, end + buffer) for a booking.
+
+    Two confirmed bookings of a business conflict exactly when their
+    [start, end + buffer) intervals overlap, and overlapping intervals always
+    share a cell. Each cell is a document under a unique
+    (business_id, cell) index, so of any set of concurrent reservations for
+    the same time only one can insert all its cells. Cells are coarser than
+    minutes, which can only reject, never double-book, unaligned neighbours;
+    availability applies the same rounding (see availability.busy_interval),
+    so it never offers a slot this would refuse.
+    """
+    docs = slot_lock_docs(business_id, booking_id, start, end, buffer_minutes)
+    try:
+        await db.get_collection("slot_locks").insert_many(docs, ordered=True)
+    except BulkWriteError as e:
+        await release_slot(booking_id)
+        if all(err.get("code") == 11000 for err in e.details.get("writeErrors", [])):
+            return False
+        raise
+    return True
+
+async def release_slot(booking_id: ObjectId) -> None:
+    await db.get_collection("slot_locks").delete_many({"booking_id": booking_id})
@@ -0,0 +1,88 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from cachetools import TTLCache
+
+from app.config import settings
+
+class DocumentCache:
+    """Process-local read-through cache (bounded LRU + TTL) for rarely changing documents.
+
+    Concurrent misses on the same key share a single loader call. Callers get
+    a copy of the cached document, so they are free to mutate it.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300):
+        self.name = name
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        caches[name] = self
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        try:
+            doc = self._cache[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return copy.deepcopy(doc)
+
+        self.misses += 1
+        pending = self._pending.get(key)
+        if pending is not None:
+            doc = await asyncio.shield(pending)
+            return copy.deepcopy(doc)
+
+        version = self._version
+        pending = asyncio.ensure_future(loader())
+        self._pending[key] = pending
+        try:
+            doc = await pending
+        finally:
+            self._pending.pop(key, None)
+        # Skip storing if a write invalidated the cache while we were loading
+        if doc is not None and version == self._version:
+            self._cache[key] = doc
+        return copy.deepcopy(doc)
+
+    def peek(self, key: Hashable) -> Optional[dict]:
+        """A copy of the cached document, or None; never loads."""
+        doc = self._cache.get(key)
+        return copy.deepcopy(doc) if doc is not None else None
+
+    def put(self, key: Hashable, doc: dict) -> None:
+        """Store a document the caller has just read or written."""
+        self._cache[key] = copy.deepcopy(doc)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._version += 1
+        self.invalidations += 1
+        self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        self._version += 1
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+        }
+
+caches: Dict[str, DocumentCache] = {}
+
+business_cache = DocumentCache("businesses", maxsize=settings.business_cache_size, ttl=settings.business_cache_ttl)
+service_cache = DocumentCache("services", maxsize=settings.service_cache_size, ttl=settings.service_cache_ttl)
+customer_cache = DocumentCache("customers", maxsize=settings.customer_cache_size, ttl=settings.customer_cache_ttl)
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from typing import Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.db import db
+from app.logic.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Error codes meaning the deployment cannot serve change streams at all
+# (standalone server, or a storage engine without majority read concern)
+UNSUPPORTED_CODES = {40573, 40324, 136}
+# The resume token fell off the oplog
+HISTORY_LOST = 286
+RETRY_DELAY = 5
+
+class CacheInvalidator:
+    """Keep the process-local document caches coherent across workers.
+
+    Watches one change stream over the cached collections and evicts the
+    changed `_id` from the matching cache, so a write made by any worker is
+    seen by every worker within milliseconds. When change streams are not
+    available (standalone mongod, tests) it stops and the caches fall back to
+    their TTL. Caches are cleared whenever events may have been missed.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+        self.mode = "ttl"
+        self.events = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.mode = "ttl"
+
+    def _clear_all(self) -> None:
+        for cache in caches.values():
+            cache.clear()
+
+    def handle(self, change: dict) -> None:
+        self.events += 1
+        self._resume_token = change.get("_id")
+        operation = change.get("operationType")
+        cache = caches.get(change.get("ns", {}).get("coll"))
+        if operation in ("insert", "update", "replace", "delete"):
+            if cache is not None:
+                cache.invalidate(change["documentKey"]["_id"])
+        elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            self._clear_all()
+            self._resume_token = None
+
+    async def _watch(self) -> None:
+        pipeline = [{"$match": {"ns.coll": {"$in": list(caches)}}}]
+        async with db.database().watch(pipeline, resume_after=self._resume_token) as stream:
+            if self._resume_token is None:
+                # Nothing to resume from: whatever is cached may predate the stream
+                self._clear_all()
+            self.mode = "change_stream"
+            logger.info("Watching %s for cache invalidation", ", ".join(caches))
+            async for change in stream:
+                self.handle(change)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in UNSUPPORTED_CODES:
+                    logger.warning("Change streams unavailable (%s); caches rely on TTL", e)
+                    self.mode = "ttl"
+                    return
+                if e.code == HISTORY_LOST:
+                    self._resume_token = None
+                self._on_error(e)
+            except PyMongoError as e:
+                self._on_error(e)
+            except Exception:
+                # e.g. a client without change stream support (mongomock in tests)
+                logger.exception("Cache change stream failed; caches rely on TTL")
+                self.mode = "ttl"
+                return
+            await asyncio.sleep(RETRY_DELAY)
+
+    def _on_error(self, error: Exception) -> None:
+        logger.warning("Cache change stream interrupted: %s; retrying in %ss", error, RETRY_DELAY)
+        self.mode = "ttl"
+
+cache_invalidator = CacheInvalidator()
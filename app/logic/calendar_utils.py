@@ -0,0 +1,120 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from app.db import db
+from app.logic.legacy_ids import id_match, legacy_ids_pending
+from app.logic.schedule import get_schedule, get_timezone
+
+HOUR_FORMAT = "%Y-%m-%dT%H"
+
+def local_window(start: date, end: date, tz_str: str) -> Tuple[datetime, datetime]:
+    """UTC bounds of the local dates [start, end) in the business timezone."""
+    tz = get_timezone(tz_str)
+    return (
+        datetime.combine(start, time(), tzinfo=tz).astimezone(timezone.utc),
+        datetime.combine(end, time(), tzinfo=tz).astimezone(timezone.utc)
+    )
+
+def calendar_pipeline(business_id: str, window_start: datetime, window_end: datetime,
+                      statuses: Sequence[str], tz_str: str, legacy_ids: bool = False) -> List[dict]:
+    """Bookings starting in the window, grouped by local start hour, start minute and length.
+
+    Bookings with the same start hour, minute and length cover the same
+    hours, so `split_by_hour` can spread each group's minutes without the
+    individual bookings.
+    """
+    return [
+        {"$match": {
+            "business_id": id_match(business_id, legacy_ids),
+            "status": {"$in": list(statuses)},
+            "start_time": {"$gte": window_start, "$lt": window_end}
+        }},
+        {"$group": {
+            "_id": {
+                "hour": {"$dateToString": {"format": HOUR_FORMAT, "date": "$start_time", "timezone": tz_str}},
+                "minute": {"$minute": {"date": "$start_time", "timezone": tz_str}},
+                "duration_ms": {"$subtract": ["$end_time", "$start_time"]}
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
+
+def split_by_hour(hour: str, minute: int, duration_ms: int, tz: ZoneInfo) -> Iterator[Tuple[str, int]]:
+    """(local hour, milliseconds) for each hour a booking starting at `hour`:`minute` overlaps."""
+    hour_start = datetime.strptime(hour, HOUR_FORMAT).replace(tzinfo=tz).astimezone(timezone.utc)
+    start = hour_start + timedelta(minutes=minute)
+    end = start + timedelta(milliseconds=duration_ms)
+    while hour_start < end:
+        hour_end = hour_start + timedelta(hours=1)
+        overlap = min(end, hour_end) - max(start, hour_start)
+        yield hour_start.astimezone(tz).strftime(HOUR_FORMAT), overlap // timedelta(milliseconds=1)
+        hour_start = hour_end
+
+def _open_minutes_by_hour(schedule, day: date) -> Dict[int, int]:
+    minutes: Dict[int, int] = {}
+    for start, end in schedule.local_intervals(day):
+        current = start
+        while current < end:
+            hour_end = current.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            step_end = min(hour_end, end)
+            minutes[current.hour] = minutes.get(current.hour, 0) + int((step_end - current).total_seconds() // 60)
+            current = step_end
+    return minutes
+
+def _occupancy(booked: int, open_minutes: int) -> float:
+    return round(booked / open_minutes, 4) if open_minutes else 0.0
+
+async def load_calendar(business: dict, start: date, end: date, statuses: Sequence[str]) -> List[dict]:
+    """Per-day and per-hour booking counts and occupancy in the business timezone.
+
+    One `$group` aggregation buckets bookings by the local hour they start
+    in; days are summed from the hours. A booking counts once, in the hour
+    it starts in, but its minutes are split across every hour it overlaps,
+    so occupancy is booked minutes over working minutes of that hour.
+    """
+    tz_str = business["timezone"]
+    window_start, window_end = local_window(start, end, tz_str)
+    pipeline = calendar_pipeline(
+        str(business["_id"]), window_start, window_end, statuses, tz_str, await legacy_ids_pending()
+    )
+    tz = get_timezone(tz_str)
+    counts: Dict[str, int] = {}
+    booked_ms: Dict[str, int] = {}
+    async for row in db.get_collection("bookings", read_profile="list").aggregate(pipeline):
+        key = row["_id"]
+        counts[key["hour"]] = counts.get(key["hour"], 0) + row["count"]
+        for hour, ms in split_by_hour(key["hour"], key["minute"], key["duration_ms"], tz):
+            booked_ms[hour] = booked_ms.get(hour, 0) + ms * row["count"]
+    schedule = get_schedule(business["working_hours"], tz_str)
+
+    days = []
+    day = start
+    while day < end:
+        open_by_hour = _open_minutes_by_hour(schedule, day)
+        hours = []
+        for hour in range(24):
+            key = f"{day.isoformat()}T{hour:02d}"
+            open_minutes = open_by_hour.get(hour, 0)
+            if key not in booked_ms and not open_minutes:
+                continue
+            booked = int(booked_ms.get(key, 0) // 60000)
+            hours.append({
+                "hour": hour,
+                "count": counts.get(key, 0),
+                "booked_minutes": booked,
+                "open_minutes": open_minutes,
+                "occupancy": _occupancy(booked, open_minutes)
+            })
+        booked = sum(h["booked_minutes"] for h in hours)
+        open_minutes = sum(open_by_hour.values())
+        days.append({
+            "date": day,
+            "count": sum(h["count"] for h in hours),
+            "booked_minutes": booked,
+            "open_minutes": open_minutes,
+            "occupancy": _occupancy(booked, open_minutes),
+            "hours": hours
+        })
+        day += timedelta(days=1)
+    return days
@@ -1,45 +1,290 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
 from bson import ObjectId
+from cachetools import TTLCache
 from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
+from app.config import settings
 from app.db import db
+from app.logic.legacy_ids import id_match, legacy_ids_pending
+from app.logic.pagination import after_cursor, encode_cursor
 from app.models.conversations import Message, ConversationInDB
 
-async def get_conversation(business_id: str, customer_id: str) -> Optional[dict]:
-    """Get a conversation between a business and customer."""
-    collection = db.get_collection("conversations")
-    conversation = await collection.find_one({
-        "business_id": ObjectId(business_id),
-        "customer_id": ObjectId(customer_id)
-    })
+MESSAGE_PROJECTION = {"_id": 0, "dir": 1, "text": 1, "ts": 1, "provider_message_id": 1}
+# Projection leaving out the prompt-context and dedup fields, which listings don't return
+WITHOUT_CONTEXT = {"recent_messages": 0, "language": 0, "next_booking": 0, "appended_ids": 0}
+CONTEXT_PROJECTION = {
+    "business_id": 1, "customer_id": 1, "language": 1, "message_count": 1,
+    "last_message_at": 1, "recent_messages": 1, "next_booking": 1
+}
+
+# (business_id, provider_message_id) -> append result of recently ingested messages
+recent_deliveries = TTLCache(maxsize=settings.delivery_cache_size, ttl=settings.delivery_cache_ttl)
+
+def recent_delivery(business_id: str, provider_message_id: Optional[str]) -> Optional[dict]:
+    """The earlier append result for a redelivered message, if this process saw it recently."""
+    if not provider_message_id:
+        return None
+    result = recent_deliveries.get((business_id, provider_message_id))
+    return {**result, "duplicate": True} if result else None
+
+async def get_messages_by_customer(business_id: str, customer_ids: List[ObjectId]) -> Dict[ObjectId, List[dict]]:
+    """Get the messages of several conversations of a business in one query."""
+    cursor = db.get_collection("messages", read_profile="list").find(
+        {"business_id": ObjectId(business_id), "customer_id": {"$in": customer_ids}},
+        {**MESSAGE_PROJECTION, "customer_id": 1}
+    ).sort("ts", 1)
+    grouped: Dict[ObjectId, List[dict]] = {}
+    async for msg in cursor:
+        grouped.setdefault(msg.pop("customer_id"), []).append(msg)
+    return grouped
+
+async def get_message_page(
+    business_id: str,
+    customer_id: str,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Get one page of messages and the cursor of the next one, keyed on (ts, _id).
+
+    Without `after` the page is the newest `limit` messages older than
+    `before`; with `after` it is the oldest `limit` messages newer than it.
+    `cursor` continues a previous page in the same direction, so messages
+    sharing a timestamp are neither skipped nor repeated at page edges.
+    Messages are always returned in chronological order.
+    """
+    query = {"business_id": ObjectId(business_id), "customer_id": ObjectId(customer_id)}
+    ts_range = {}
+    if before is not None:
+        ts_range["$lt"] = before
+    if after is not None:
+        ts_range["$gt"] = after
+    if ts_range:
+        query["ts"] = ts_range
+
+    direction = 1 if after is not None else -1
+    if cursor:
+        query = {"$and": [query, after_cursor("ts", cursor, direction)]}
+    messages = await db.get_collection("messages").find(query, {**MESSAGE_PROJECTION, "_id": 1}) \
+        .sort([("ts", direction), ("_id", direction)]) \
+        .limit(limit + 1) \
+        .to_list(limit + 1)
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1]["ts"], messages[-1]["_id"])
+    for message in messages:
+        del message["_id"]
+    if direction < 0:
+        messages.reverse()
+    return messages, next_cursor
+
+async def get_conversation_page(
+    business_id: str,
+    customer_id: str,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Optional[dict]:
+    """Get a conversation with a single page of its messages."""
+    conversation = await db.get_collection("conversations").find_one(
+        {"business_id": ObjectId(business_id), "customer_id": ObjectId(customer_id)},
+        {"messages": 0, **WITHOUT_CONTEXT}
+    )
     if conversation:
-        # Convert _id to id for Pydantic model
         conversation["id"] = conversation.pop("_id")
+        conversation["messages"], conversation["next_cursor"] = await get_message_page(
+            business_id, customer_id, before, after, limit, cursor
+        )
+        conversation["has_more"] = conversation["next_cursor"] is not None
     return conversation
 
-async def add_message(business_id: str, customer_id: str, message: Message) -> dict:
-    """Add a message to a conversation, creating it if it doesn't exist."""
+# Provider message ids kept on each conversation, so a redelivery can tell
+# whether the conversation update of its first delivery was applied
+APPENDED_IDS_KEPT = 200
+
+async def _existing_delivery(business_oid: ObjectId, customer_oid: ObjectId, message: Message) -> dict:
+    """The result of an earlier delivery of `message` that the conversation already counts."""
+    conversation = await db.get_collection("conversations").find_one(
+        {"business_id": business_oid, "customer_id": customer_oid},
+        {"message_count": 1}
+    )
+    return {
+        "conversation_id": conversation["_id"],
+        "message": message,
+        "message_count": conversation["message_count"],
+        "duplicate": True
+    }
+
+def append_update(messages: Sequence[Message], language: Optional[str] = None) -> dict:
+    """Conversation update for appending `messages`: counters, the rolling context and their provider ids."""
+    update = {
+        "$inc": {"message_count": len(messages)},
+        "$max": {"last_message_at": max(m.ts for m in messages)},
+        "$push": {"recent_messages": {
+            "$each": [m.model_dump(exclude_none=True) for m in messages],
+            "$sort": {"ts": 1},
+            "$slice": -settings.context_messages
+        }}
+    }
+    keys = [m.provider_message_id for m in messages if m.provider_message_id]
+    if keys:
+        update["$push"]["appended_ids"] = {"$each": keys, "$slice": -APPENDED_IDS_KEPT}
+    if language:
+        update["$set"] = {"language": language}
+    return update
+
+async def _append_to_conversation(business_oid: ObjectId, customer_oid: ObjectId, message: Message,
+                                  language: Optional[str]) -> Optional[dict]:
+    """Count `message` on its conversation, creating it if needed; None if it was already counted.
+
+    A message with a provider id only matches a conversation that doesn't
+    list the id yet. When the conversation does, the upsert collides with the
+    unique (business_id, customer_id) index instead of counting it twice.
+    """
+    query = {"business_id": business_oid, "customer_id": customer_oid}
+    if message.provider_message_id:
+        query["appended_ids"] = {"$ne": message.provider_message_id}
+    for _ in range(2):
+        try:
+            return await db.get_collection("conversations").find_one_and_update(
+                query,
+                append_update([message], language),
+                projection={"message_count": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Either the message is already counted, or a concurrent append
+            # just created the conversation; a second try tells them apart
+            continue
+    return None
+
+async def add_message(business_id: str, customer_id: str, message: Message, language: Optional[str] = None) -> dict:
+    """Append a message to a conversation, creating it if it doesn't exist.
+
+    Messages live in their own collection, so an append is one insert plus a
+    counter bump on the conversation; the history is never rewritten or read.
+    Creating the conversation also fills in next_booking, since bookings made
+    before the first message had no conversation to note them on.
+    A message whose provider_message_id was already stored for the business
+    is not inserted again, and it is counted on the conversation only if its
+    first delivery stopped before doing so.
+    """
     try:
-        collection = db.get_collection("conversations")
-        
-        # Use findOneAndUpdate with upsert for atomic operation
-        result = await collection.find_one_and_update(
-            {
-                "business_id": ObjectId(business_id),
-                "customer_id": ObjectId(customer_id)
-            },
+        business_oid = ObjectId(business_id)
+        customer_oid = ObjectId(customer_id)
+        key = message.provider_message_id
+
+        try:
+            await db.get_collection("messages").insert_one({
+                "business_id": business_oid,
+                "customer_id": customer_oid,
+                **message.model_dump(exclude_none=True)
+            })
+        except DuplicateKeyError:
+            # A redelivery: report the stored message, and count it below if
+            # the first delivery never reached the conversation
+            stored = await db.get_collection("messages").find_one(
+                {"business_id": business_oid, "provider_message_id": key},
+                MESSAGE_PROJECTION
+            )
+            if stored:
+                message = Message(**stored)
+
+        conversation = await _append_to_conversation(business_oid, customer_oid, message, language)
+        if conversation is None:
+            existing = await _existing_delivery(business_oid, customer_oid, message)
+            if key:
+                recent_deliveries[(business_id, key)] = existing
+            return existing
+
+        if conversation["message_count"] == 1:
+            # New conversation: pick up bookings made before the first message
+            await refresh_next_booking(business_oid, customer_oid)
+        result = {
+            "conversation_id": conversation["_id"],
+            "message": message,
+            "message_count": conversation["message_count"]
+        }
+        if key:
+            recent_deliveries[(business_id, key)] = result
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def get_context(business_id: str, customer_id: str) -> Optional[dict]:
+    """The rolling prompt context of a conversation, in one read by the unique key."""
+    context = await db.get_collection("conversations").find_one(
+        {"business_id": ObjectId(business_id), "customer_id": ObjectId(customer_id)},
+        CONTEXT_PROJECTION
+    )
+    if context is None:
+        return None
+    context["conversation_id"] = context.pop("_id")
+    next_booking = context.get("next_booking")
+    if next_booking and next_booking["start_time"] < datetime.utcnow():
+        # The cached booking has started; look up the one after it
+        context["next_booking"] = await refresh_next_booking(context["business_id"], context["customer_id"])
+    return context
+
+def _next_booking(booking: dict) -> dict:
+    return {
+        "booking_id": booking["_id"],
+        "service_id": booking["service_id"],
+        "start_time": booking["start_time"],
+        "end_time": booking["end_time"]
+    }
+
+async def note_bookings(bookings: Sequence[dict]) -> None:
+    """Make new confirmed bookings their conversation's next_booking where they are sooner."""
+    now = datetime.utcnow()
+    updates = [
+        (
             {
-                "$push": {"messages": message.dict()}
+                "business_id": ObjectId(booking["business_id"]),
+                "customer_id": ObjectId(booking["customer_id"]),
+                "$or": [
+                    {"next_booking": None},
+                    {"next_booking.start_time": {"$gt": booking["start_time"]}},
+                    {"next_booking.start_time": {"$lt": now}}
+                ]
             },
-            upsert=True,
-            return_document=True
+            {"$set": {"next_booking": _next_booking(booking)}}
         )
-        
-        if result:
-            # Convert _id to id for Pydantic model
-            result["id"] = result.pop("_id")
-            return result
-        
-        raise HTTPException(status_code=500, detail="Failed to add message to conversation")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        for booking in bookings
+    ]
+    conversations = db.get_collection("conversations")
+    if len(updates) == 1:
+        # The single-booking create path: a plain update, no bulk machinery
+        await conversations.update_one(*updates[0])
+    elif updates:
+        await conversations.bulk_write([UpdateOne(f, u) for f, u in updates], ordered=False)
+
+async def refresh_next_booking(business_id, customer_id) -> Optional[dict]:
+    """Recompute next_booking after a booking was cancelled, moved or deleted."""
+    business_oid, customer_oid = ObjectId(business_id), ObjectId(customer_id)
+    legacy = await legacy_ids_pending()
+    upcoming = await db.get_collection("bookings").find_one(
+        {
+            "business_id": id_match(business_oid, legacy),
+            "customer_id": id_match(customer_oid, legacy),
+            "status": "confirmed",
+            "start_time": {"$gte": datetime.utcnow()}
+        },
+        {"service_id": 1, "start_time": 1, "end_time": 1},
+        sort=[("start_time", 1)]
+    )
+    next_booking = _next_booking(upcoming) if upcoming else None
+    await db.get_collection("conversations").update_one(
+        {"business_id": business_oid, "customer_id": customer_oid},
+        {"$set": {"next_booking": next_booking}}
+    )
+    return next_booking
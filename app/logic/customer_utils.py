@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from bson import ObjectId
+from cachetools import TTLCache
+
+from app.config import settings
+from app.db import db
+from app.logic.cache import customer_cache
+from app.logic.persistence import update_document
+from app.logic.search_utils import normalize_phone
+from app.models.customers import CustomerCreate
+
+# whatsapp_id -> _id; both are immutable, so entries never go stale
+customer_ids = TTLCache(maxsize=settings.customer_cache_size, ttl=settings.customer_cache_ttl)
+
+async def get_customer(customer_id: str) -> dict:
+    oid = ObjectId(customer_id)
+    customer = await customer_cache.get(
+        oid, lambda: db.get_collection("customers").find_one({"_id": oid})
+    )
+    if not customer:
+        raise ValueError("Customer not found")
+    return customer
+
+def customer_upsert(customer: CustomerCreate, now: datetime) -> dict:
+    """Build the update that creates a customer or refreshes the fields it was sent with."""
+    update_data = customer.model_dump(exclude_unset=True)
+    on_insert = {k: v for k, v in customer.model_dump().items() if k not in update_data}
+    on_insert["created_at"] = now
+    update_data["phone_normalized"] = normalize_phone(customer.phone)
+    return {"$set": update_data, "$setOnInsert": on_insert}
+
+async def upsert_customer(customer: CustomerCreate) -> dict:
+    """Create or refresh a customer by whatsapp_id, skipping the write when nothing changed.
+
+    A known customer whose cached document already holds the sent fields
+    costs no round trip; otherwise this is one upsert.
+    """
+    oid = customer_ids.get(customer.whatsapp_id)
+    if oid is not None:
+        cached = customer_cache.peek(oid)
+        sent = customer.model_dump(exclude_unset=True)
+        if cached and all(cached.get(k) == v for k, v in sent.items()):
+            return cached
+
+    saved = await update_document(
+        "customers",
+        {"whatsapp_id": customer.whatsapp_id},
+        customer_upsert(customer, datetime.utcnow()),
+        upsert=True
+    )
+    customer_ids[customer.whatsapp_id] = saved["_id"]
+    customer_cache.put(saved["_id"], saved)
+    return saved
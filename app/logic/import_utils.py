@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.db import db
+from app.logic.availability import SlotIndex, as_utc, busy_interval, load_slot_index
+from app.logic.booking_utils import slot_lock_docs
+from app.logic.cache import customer_cache
+from app.logic.conversation_utils import note_bookings
+from app.logic.customer_utils import customer_upsert
+from app.logic.schedule import get_schedule
+from app.models.bookings import BookingImport
+from app.models.customers import CustomerCreate
+
+MAX_BULK_ROWS = 5000
+
+def _error(index: int, detail: str) -> dict:
+    return {"index": index, "status": "error", "detail": detail}
+
+def _failed_indexes(e: BulkWriteError) -> Dict[int, str]:
+    return {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+
+async def _load_by_id(collection: str, ids: Iterable[ObjectId]) -> Dict[ObjectId, dict]:
+    cursor = db.get_collection(collection).find({"_id": {"$in": list(set(ids))}})
+    return {doc["_id"]: doc async for doc in cursor}
+
+async def import_bookings(rows: List[BookingImport]) -> List[dict]:
+    """Validate and insert a batch of bookings in a handful of round trips.
+
+    Businesses and services are loaded with one `$in` query each, overlaps are
+    checked against one preloaded SlotIndex per business (which also catches
+    conflicts between rows of the same payload), and slot locks and bookings
+    are written with unordered `insert_many`.
+    """
+    results: List[dict] = [None] * len(rows)
+    businesses = await _load_by_id("businesses", (r.business_id for r in rows))
+    services = await _load_by_id("services", (r.service_id for r in rows))
+
+    # Preload one interval index per business covering its confirmed rows
+    windows: Dict[ObjectId, List[datetime]] = {}
+    for row in rows:
+        if row.status == "confirmed" and row.business_id in businesses and row.service_id in services:
+            start = as_utc(row.start_time)
+            end = start + timedelta(minutes=services[row.service_id]["duration_minutes"])
+            window = windows.setdefault(row.business_id, [start, end])
+            window[0] = min(window[0], start)
+            window[1] = max(window[1], end)
+    indexes: Dict[ObjectId, SlotIndex] = {}
+    for business_id, (window_start, window_end) in windows.items():
+        buffer = businesses[business_id].get("buffer_minutes", 0)
+        indexes[business_id] = await load_slot_index(business_id, window_start, window_end, buffer)
+
+    docs: List[dict] = []
+    doc_rows: List[int] = []
+    lock_docs: List[dict] = []
+    now = datetime.utcnow()
+    for i, row in enumerate(rows):
+        biz = businesses.get(row.business_id)
+        if biz is None:
+            results[i] = _error(i, "Business not found")
+            continue
+        svc = services.get(row.service_id)
+        if svc is None:
+            results[i] = _error(i, "Service not found")
+            continue
+
+        duration = timedelta(minutes=svc["duration_minutes"])
+        start_utc = as_utc(row.start_time)
+        end_utc = start_utc + duration
+        booking_id = ObjectId()
+
+        if row.status == "confirmed":
+            if not get_schedule(biz["working_hours"], biz["timezone"]).is_open(start_utc, end_utc):
+                results[i] = _error(i, "Outside business working hours")
+                continue
+            buffer = timedelta(minutes=biz.get("buffer_minutes", 0))
+            index = indexes[row.business_id]
+            if not index.is_free(start_utc, end_utc):
+                results[i] = _error(i, "Time slot not available")
+                continue
+            index.add(*busy_interval(start_utc, end_utc, buffer))
+            lock_docs.extend(slot_lock_docs(row.business_id, booking_id, start_utc, end_utc, biz.get("buffer_minutes", 0)))
+
+        doc = row.model_dump(by_alias=True)
+        doc.update({
+            "_id": booking_id,
+            "end_time": end_utc,
+            "created_at": now,
+            "updated_at": now
+        })
+        docs.append(doc)
+        doc_rows.append(i)
+
+    # Claim slot locks; a clash means a concurrent writer took the slot
+    lost = set()
+    if lock_docs:
+        try:
+            await db.get_collection("slot_locks").insert_many(lock_docs, ordered=False)
+        except BulkWriteError as e:
+            lost = {lock_docs[idx]["booking_id"] for idx in _failed_indexes(e)}
+            await db.get_collection("slot_locks").delete_many({"booking_id": {"$in": list(lost)}})
+
+    to_insert = []
+    insert_rows = []
+    for doc, i in zip(docs, doc_rows):
+        if doc["_id"] in lost:
+            results[i] = _error(i, "Time slot not available")
+        else:
+            to_insert.append(doc)
+            insert_rows.append(i)
+
+    failed: Dict[int, str] = {}
+    if to_insert:
+        try:
+            await db.get_collection("bookings").insert_many(to_insert, ordered=False)
+        except BulkWriteError as e:
+            failed = _failed_indexes(e)
+            await db.get_collection("slot_locks").delete_many(
+                {"booking_id": {"$in": [to_insert[idx]["_id"] for idx in failed]}}
+            )
+
+    soonest: Dict[tuple, dict] = {}
+    for idx, (doc, i) in enumerate(zip(to_insert, insert_rows)):
+        if idx in failed:
+            results[i] = _error(i, failed[idx])
+            continue
+        results[i] = {"index": i, "status": "created", "id": str(doc["_id"])}
+        if doc["status"] == "confirmed":
+            key = (doc["business_id"], doc["customer_id"])
+            if key not in soonest or doc["start_time"] < soonest[key]["start_time"]:
+                soonest[key] = doc
+    await note_bookings(list(soonest.values()))
+    return results
+
+async def import_customers(rows: List[CustomerCreate]) -> List[dict]:
+    """Upsert a batch of customers by whatsapp_id with one unordered bulk_write."""
+    results: List[dict] = [None] * len(rows)
+    now = datetime.utcnow()
+    ops = []
+    op_rows: List[int] = []
+    seen = set()
+    for i, customer in enumerate(rows):
+        if customer.whatsapp_id in seen:
+            results[i] = _error(i, "Duplicate whatsapp_id in payload")
+            continue
+        seen.add(customer.whatsapp_id)
+        ops.append(UpdateOne(
+            {"whatsapp_id": customer.whatsapp_id},
+            customer_upsert(customer, now),
+            upsert=True
+        ))
+        op_rows.append(i)
+
+    if not ops:
+        return results
+
+    failed: Dict[int, str] = {}
+    try:
+        result = await db.get_collection("customers").bulk_write(ops, ordered=False)
+        upserted = result.upserted_ids
+    except BulkWriteError as e:
+        failed = _failed_indexes(e)
+        upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+
+    # Updated rows don't report their _id, so resolve them in one query
+    updated = [rows[i].whatsapp_id for idx, i in enumerate(op_rows) if idx not in failed and idx not in upserted]
+    existing = {}
+    if updated:
+        cursor = db.get_collection("customers").find({"whatsapp_id": {"$in": updated}}, {"whatsapp_id": 1})
+        existing = {doc["whatsapp_id"]: doc["_id"] async for doc in cursor}
+
+    for idx, i in enumerate(op_rows):
+        if idx in failed:
+            results[i] = _error(i, failed[idx])
+        elif idx in upserted:
+            results[i] = {"index": i, "status": "created", "id": str(upserted[idx])}
+        else:
+            results[i] = {"index": i, "status": "updated", "id": str(existing.get(rows[i].whatsapp_id))}
+    for oid in existing.values():
+        customer_cache.invalidate(oid)
+    return results
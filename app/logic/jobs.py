@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.db import db
+from app.logic.lease import Lease
+from app.logic.legacy_ids import legacy_ids_pending
+
+logger = logging.getLogger(__name__)
+
+SWEEP_PROJECTION = {"business_id": 1, "customer_id": 1, "service_id": 1, "start_time": 1}
+
+async def _due_batches(query: dict, sort_field: str, batch_size: int):
+    """Yield batches of bookings matching `query` with one range query each.
+
+    Each batch must be updated out of `query` before the next one is read,
+    so no cursor has to stay open across the writes.
+    """
+    bookings = db.get_collection("bookings")
+    while True:
+        batch = await bookings.find(query, SWEEP_PROJECTION).sort(sort_field, 1).to_list(batch_size)
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+
+async def _tracked_businesses() -> List:
+    cursor = db.get_collection("businesses").find({"track_check_ins": True}, {"_id": 1})
+    ids = [biz["_id"] async for biz in cursor]
+    if await legacy_ids_pending():
+        ids += [str(oid) for oid in ids]
+    return ids
+
+async def _set_status(query: dict, status: str, sort_field: str, batch_size: int) -> int:
+    bookings = db.get_collection("bookings")
+    total = 0
+    async for batch in _due_batches(query, sort_field, batch_size):
+        result = await bookings.update_many(
+            {"_id": {"$in": [b["_id"] for b in batch]}, "status": "confirmed"},
+            {"$set": {"status": status, "updated_at": datetime.utcnow()}}
+        )
+        total += result.modified_count
+    return total
+
+async def mark_no_shows(now: datetime, batch_size: int) -> int:
+    """Confirmed bookings at businesses that track check-ins, never checked in
+    within `no_show_after_minutes` of their start."""
+    tracked = await _tracked_businesses()
+    if not tracked:
+        return 0
+    query = {
+        "status": "confirmed",
+        "start_time": {"$lte": now - timedelta(minutes=settings.no_show_after_minutes)},
+        "business_id": {"$in": tracked},
+        "checked_in_at": None
+    }
+    return await _set_status(query, "no_show", "start_time", batch_size)
+
+async def complete_bookings(now: datetime, batch_size: int) -> int:
+    """Confirmed bookings that ended `complete_after_minutes` ago. At
+    businesses that track check-ins only checked-in bookings complete."""
+    tracked = await _tracked_businesses()
+    query = {
+        "status": "confirmed",
+        "end_time": {"$lte": now - timedelta(minutes=settings.complete_after_minutes)}
+    }
+    if tracked:
+        query["$or"] = [{"business_id": {"$nin": tracked}}, {"checked_in_at": {"$ne": None}}]
+    return await _set_status(query, "completed", "end_time", batch_size)
+
+async def queue_reminders(now: datetime, batch_size: int) -> int:
+    """Queue one reminder in `outbox` for each confirmed booking starting
+    within `reminder_lead_minutes`.
+
+    The outbox is unique on (booking_id, kind), so a batch replayed after a
+    crash or a lease handover does not queue a reminder twice.
+    """
+    query = {
+        "status": "confirmed",
+        "start_time": {"$gt": now, "$lte": now + timedelta(minutes=settings.reminder_lead_minutes)},
+        "reminder_queued_at": None
+    }
+    bookings = db.get_collection("bookings")
+    outbox = db.get_collection("outbox")
+    total = 0
+    async for batch in _due_batches(query, "start_time", batch_size):
+        queued_at = datetime.utcnow()
+        try:
+            result = await outbox.insert_many([
+                {
+                    "kind": "reminder",
+                    "booking_id": b["_id"],
+                    "business_id": b["business_id"],
+                    "customer_id": b["customer_id"],
+                    "service_id": b["service_id"],
+                    "start_time": b["start_time"],
+                    "status": "pending",
+                    "created_at": queued_at
+                }
+                for b in batch
+            ], ordered=False)
+            total += len(result.inserted_ids)
+        except BulkWriteError as e:
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            total += e.details["nInserted"]
+        await bookings.update_many(
+            {"_id": {"$in": [b["_id"] for b in batch]}},
+            {"$set": {"reminder_queued_at": queued_at}}
+        )
+    return total
+
+SWEEPS = [
+    ("no_show", mark_no_shows),
+    ("completed", complete_bookings),
+    ("reminders", queue_reminders),
+]
+
+class JobScheduler:
+    """Run the booking sweeps every `interval` seconds on one worker.
+
+    Every worker schedules the tick, but only the holder of the `sweeps`
+    lease runs it; the lease is renewed on each tick and outlives a few
+    missed ticks before another worker takes over.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lease = Lease("sweeps", ttl=timedelta(seconds=interval * 3))
+        self.last_run: Optional[datetime] = None
+        self.last_counts: Dict[str, int] = {}
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self._current: Optional[asyncio.Future] = None
+
+    def start(self) -> None:
+        if self._scheduler is None:
+            self._scheduler = AsyncIOScheduler(timezone="UTC")
+            self._scheduler.add_job(
+                self.tick, "interval", seconds=self.interval,
+                id="sweeps", max_instances=1, coalesce=True, next_run_time=datetime.utcnow()
+            )
+            self._scheduler.start()
+
+    async def stop(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+        if self._current is not None:
+            self._current.cancel()
+        await self.lease.release()
+
+    async def tick(self) -> Dict[str, int]:
+        # Run in a separate task so stop() can cancel a tick still in flight
+        self._current = asyncio.ensure_future(self._sweep())
+        try:
+            return await self._current
+        except asyncio.CancelledError:
+            return {}
+        finally:
+            self._current = None
+
+    async def _sweep(self) -> Dict[str, int]:
+        if not await self.lease.acquire():
+            return {}
+        now = datetime.utcnow()
+        counts = {}
+        for name, sweep in SWEEPS:
+            try:
+                counts[name] = await sweep(now, self.batch_size)
+            except Exception:
+                logger.exception("Booking sweep %s failed", name)
+        self.last_run, self.last_counts = now, counts
+        if any(counts.values()):
+            logger.info("Booking sweeps: %s", ", ".join(f"{k}={v}" for k, v in counts.items()))
+        return counts
+
+job_scheduler = JobScheduler(
+    interval=settings.scheduler_interval_seconds,
+    batch_size=settings.sweep_batch_size
+)
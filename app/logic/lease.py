@@ -0,0 +1,42 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db import db
+
+class Lease:
+    """A named, expiring lock held in the `leases` collection.
+
+    `acquire()` takes the lease when it is free or expired and renews it when
+    this process already holds it, in one atomic upsert. A holder that dies
+    loses the lease once `ttl` has passed without a renewal.
+    """
+
+    def __init__(self, name: str, ttl: timedelta):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.held = False
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await db.get_collection("leases").update_one(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + self.ttl}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Held by someone else: the filter missed and the upsert hit the existing _id
+            self.held = False
+        else:
+            self.held = True
+        return self.held
+
+    async def release(self) -> None:
+        if self.held:
+            await db.get_collection("leases").delete_one({"_id": self.name, "owner": self.owner})
+            self.held = False
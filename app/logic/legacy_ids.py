@@ -0,0 +1,38 @@
+import time
+from typing import Any, Union
+
+from bson import ObjectId
+
+from app.db import db
+
+# Checkpoints written by app.migrations.object_ids, one per converted collection
+MIGRATION_CHECKPOINTS = ["object_ids:bookings", "object_ids:services", "object_ids:slot_locks"]
+RECHECK_SECONDS = 30
+
+_state = {"pending": True, "checked_at": 0.0}
+
+async def legacy_ids_pending() -> bool:
+    """Whether foreign keys may still be stored as hex strings.
+
+    True until the object_ids migration has recorded completion for every
+    collection it converts. The answer is re-read at most every
+    RECHECK_SECONDS and, once False, never again.
+    """
+    if not _state["pending"]:
+        return False
+    now = time.monotonic()
+    if now - _state["checked_at"] >= RECHECK_SECONDS:
+        _state["checked_at"] = now
+        completed = await db.get_collection("migrations").count_documents(
+            {"_id": {"$in": MIGRATION_CHECKPOINTS}, "completed_at": {"$ne": None}}
+        )
+        _state["pending"] = completed < len(MIGRATION_CHECKPOINTS)
+    return _state["pending"]
+
+def id_match(value: Any, legacy: bool) -> Union[ObjectId, dict]:
+    """Filter value for a foreign key: the ObjectId, or either stored form while legacy."""
+    oid = ObjectId(value)
+    return {"$in": [oid, str(oid)]} if legacy else oid
+
+async def match_id(value: Any) -> Union[ObjectId, dict]:
+    return id_match(value, await legacy_ids_pending())
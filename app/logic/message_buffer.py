@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.db import db
+from app.logic.conversation_utils import add_message, append_update, recent_deliveries, refresh_next_booking
+from app.models.conversations import Message
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PendingMessage:
+    business_id: str
+    customer_id: str
+    message: Message
+    language: Optional[str] = None
+    future: Optional[asyncio.Future] = None
+
+class MessageBuffer:
+    """Coalesce conversation appends into group commits.
+
+    Appends are queued and written every `flush_ms` (or `batch_size`
+    messages) as one unordered insert_many into `messages` plus one
+    bulk_write that bumps each touched conversation's counters once. The
+    queue is bounded, so producers wait when Mongo falls behind.
+
+    If the bulk_write fails after the insert, the batch's callers get a 500
+    and the provider redelivers; add_message then finds the stored message
+    missing from the conversation's appended_ids and counts it.
+    """
+
+    def __init__(self, queue_size: int, batch_size: int, flush_ms: float):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue(self.queue_size)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything queued so far and stop the writer."""
+        if self._worker is None:
+            return
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+
+    async def append(self, business_id: str, customer_id: str, message: Message,
+                     language: Optional[str] = None, wait: bool = True) -> Optional[dict]:
+        """Queue a message; with `wait`, return its append result once written."""
+        future = asyncio.get_running_loop().create_future() if wait else None
+        await self._queue.put(PendingMessage(business_id, customer_id, message, language, future))
+        return await future if future else None
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            if self.flush_interval:
+                await asyncio.sleep(self.flush_interval)
+            batch = [first]
+            stopping = False
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.exception("Failed to flush %d messages", len(batch))
+                for pending in batch:
+                    if pending.future and not pending.future.done():
+                        pending.future.set_exception(HTTPException(status_code=500, detail=str(e)))
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[PendingMessage]) -> None:
+        docs = [
+            {
+                "business_id": ObjectId(p.business_id),
+                "customer_id": ObjectId(p.customer_id),
+                **p.message.model_dump(exclude_none=True)
+            }
+            for p in batch
+        ]
+        errors: Dict[int, dict] = {}
+        try:
+            await db.get_collection("messages").insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = {error["index"]: error for error in e.details["writeErrors"]}
+
+        written: Dict[Tuple[ObjectId, ObjectId], List[PendingMessage]] = defaultdict(list)
+        for i, pending in enumerate(batch):
+            if i not in errors:
+                written[(docs[i]["business_id"], docs[i]["customer_id"])].append(pending)
+
+        conversations = db.get_collection("conversations")
+        if written:
+            result = await conversations.bulk_write([
+                UpdateOne(
+                    {"business_id": business_oid, "customer_id": customer_oid},
+                    append_update([p.message for p in appended], appended[-1].language),
+                    upsert=True
+                )
+                for (business_oid, customer_oid), appended in written.items()
+            ], ordered=False)
+            # Conversations this flush created: pick up bookings made before the first message
+            keys = list(written)
+            await asyncio.gather(*(refresh_next_booking(*keys[i]) for i in result.upserted_ids))
+
+        waiting = {key: appended for key, appended in written.items() if any(p.future for p in appended)}
+        if waiting:
+            cursor = conversations.find(
+                {"$or": [{"business_id": b, "customer_id": c} for b, c in waiting]},
+                {"business_id": 1, "customer_id": 1, "message_count": 1}
+            )
+            counts = {(conv["business_id"], conv["customer_id"]): conv async for conv in cursor}
+            for key, appended in waiting.items():
+                conv = counts[key]
+                for position, pending in enumerate(appended):
+                    result = {
+                        "conversation_id": conv["_id"],
+                        "message": pending.message,
+                        # Counter value right after this message, in batch order
+                        "message_count": conv["message_count"] - (len(appended) - 1 - position)
+                    }
+                    if pending.message.provider_message_id:
+                        recent_deliveries[(pending.business_id, pending.message.provider_message_id)] = result
+                    if pending.future and not pending.future.done():
+                        pending.future.set_result(result)
+
+        for i, error in errors.items():
+            pending = batch[i]
+            if error.get("code") == 11000:
+                # Redelivery of a stored message: resolve it the way add_message does
+                result = await add_message(pending.business_id, pending.customer_id, pending.message, pending.language)
+                if pending.future and not pending.future.done():
+                    pending.future.set_result(result)
+            elif pending.future and not pending.future.done():
+                pending.future.set_exception(HTTPException(status_code=500, detail=error.get("errmsg")))
+            else:
+                logger.error("Dropped queued message: %s", error.get("errmsg"))
+
+message_buffer = MessageBuffer(
+    queue_size=settings.message_queue_size,
+    batch_size=settings.message_batch_size,
+    flush_ms=settings.message_flush_ms
+)
+
+async def submit_message(business_id: str, customer_id: str, message: Message, language: Optional[str] = None) -> dict:
+    """Append a message using the configured MESSAGE_WRITE_MODE."""
+    if settings.message_write_mode == "sync" or not message_buffer.running:
+        return await add_message(business_id, customer_id, message, language)
+    if settings.message_write_mode == "group":
+        return await message_buffer.append(business_id, customer_id, message, language)
+    await message_buffer.append(business_id, customer_id, message, language, wait=False)
+    return {"message": message, "queued": True}
@@ -0,0 +1,184 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import bson
+from fastapi import Request
+from pymongo import monitoring
+
+from app.config import settings
+from app.logic.cache import cache_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_OPS_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        out = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            out.append((repr(float(bound)), total))
+        out.append(("+Inf", self.count))
+        return out
+
+@dataclass
+class RequestStats:
+    """Mongo work attributed to the request running in the current context."""
+    mongo_ops: int = 0
+    mongo_seconds: float = 0.0
+    mongo_bytes: int = 0
+
+@dataclass
+class CommandTotals:
+    count: int = 0
+    failures: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+_lock = threading.Lock()
+_route_latency: Dict[Tuple[str, str, str], Histogram] = {}
+_route_mongo_ops: Dict[Tuple[str, str], Histogram] = {}
+_commands: Dict[str, CommandTotals] = {}
+
+def _size(doc) -> int:
+    # pymongo's command events carry documents, not wire sizes, so sizing re-encodes them
+    if not settings.metrics_command_bytes:
+        return 0
+    try:
+        return len(bson.encode(doc))
+    except Exception:
+        return 0
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Count Mongo commands globally and against the current request.
+
+    Motor runs each operation on an executor thread with a copy of the
+    caller's context, so `current_request` still points at the request
+    that issued the command.
+    """
+
+    def __init__(self):
+        self._sent: Dict[int, int] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._sent[event.request_id] = _size(event.command)
+
+    def _record(self, event, failed: bool, reply_bytes: int) -> None:
+        seconds = event.duration_micros / 1e6
+        size = self._sent.pop(event.request_id, 0) + reply_bytes
+        with _lock:
+            totals = _commands.setdefault(event.command_name, CommandTotals())
+            totals.count += 1
+            totals.failures += failed
+            totals.seconds += seconds
+            totals.bytes += size
+        stats = current_request.get()
+        if stats is not None:
+            stats.mongo_ops += 1
+            stats.mongo_seconds += seconds
+            stats.mongo_bytes += size
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event, False, _size(event.reply))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event, True, 0)
+
+command_listener = MongoCommandListener()
+
+def _route_template(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path_format", None) or "unmatched"
+
+async def metrics_middleware(request: Request, call_next):
+    """Record per-route latency and Mongo usage; optionally emit Server-Timing."""
+    stats = RequestStats()
+    token = current_request.set(stats)
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+    finally:
+        elapsed = time.perf_counter() - started
+        current_request.reset(token)
+        route = _route_template(request)
+        with _lock:
+            _route_latency.setdefault((request.method, route, status), Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            _route_mongo_ops.setdefault((request.method, route), Histogram(MONGO_OPS_BUCKETS)).observe(stats.mongo_ops)
+
+    if settings.metrics_server_timing:
+        mongo = f"{stats.mongo_ops} ops"
+        if settings.metrics_command_bytes:
+            mongo += f" {stats.mongo_bytes} bytes"
+        response.headers["Server-Timing"] = (
+            f"app;dur={elapsed * 1000:.1f}, "
+            f'mongo;dur={stats.mongo_seconds * 1000:.1f};desc="{mongo}"'
+        )
+    return response
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+def _histogram_lines(name: str, histogram: Histogram, labels: str) -> List[str]:
+    lines = [f'{name}_bucket{{{labels},le="{bound}"}} {count}' for bound, count in histogram.cumulative()]
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+def render_metrics() -> str:
+    """Prometheus text exposition of everything collected so far."""
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    with _lock:
+        for (method, route, status), histogram in sorted(_route_latency.items()):
+            lines += _histogram_lines(
+                "http_request_duration_seconds", histogram, _labels(method=method, route=route, status=status)
+            )
+
+        lines += [
+            "# HELP http_request_mongo_commands Mongo commands issued per request, by route.",
+            "# TYPE http_request_mongo_commands histogram",
+        ]
+        for (method, route), histogram in sorted(_route_mongo_ops.items()):
+            lines += _histogram_lines("http_request_mongo_commands", histogram, _labels(method=method, route=route))
+
+        counters = [
+            ("mongo_commands_total", "count", "counter", "Mongo commands by command name."),
+            ("mongo_command_failures_total", "failures", "counter", "Failed Mongo commands by command name."),
+            ("mongo_command_seconds_total", "seconds", "counter", "Time spent in Mongo commands."),
+        ]
+        if settings.metrics_command_bytes:
+            counters.append(("mongo_command_bytes_total", "bytes", "counter", "BSON bytes sent and received."))
+        for name, attr, kind, help_text in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for command, totals in sorted(_commands.items()):
+                lines.append(f"{name}{{{_labels(command=command)}}} {getattr(totals, attr)}")
+
+    for name, key in (("cache_hits_total", "hits"), ("cache_misses_total", "misses"), ("cache_entries", "size")):
+        lines += [f"# TYPE {name} {'gauge' if key == 'size' else 'counter'}"]
+        for cache, stats in sorted(cache_stats().items()):
+            lines.append(f"{name}{{{_labels(cache=cache)}}} {stats[key]}")
+
+    return "\n".join(lines) + "\n"
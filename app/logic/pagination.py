@@ -0,0 +1,30 @@
+import base64
+from typing import Any, Tuple
+
+from bson import ObjectId, json_util
+from bson.json_util import JSONMode, JSONOptions
+
+# Extended JSON keeps the sort value's type (datetime, string, number) across the round trip
+CURSOR_JSON = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=False)
+
+def encode_cursor(sort_value: Any, oid: ObjectId) -> str:
+    """Opaque keyset cursor pointing just past (sort_value, _id)."""
+    raw = json_util.dumps([sort_value, oid], json_options=CURSOR_JSON).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, oid = json_util.loads(base64.urlsafe_b64decode(padded), json_options=CURSOR_JSON)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(oid, ObjectId):
+        raise ValueError("Invalid cursor")
+    return sort_value, oid
+
+def after_cursor(field: str, cursor: str, direction: int = 1) -> dict:
+    """Filter for documents sorted by (field, _id) in `direction` that come after `cursor`."""
+    value, oid = decode_cursor(cursor)
+    op = "$gt" if direction > 0 else "$lt"
+    return {"$or": [{field: {op: value}}, {field: value, "_id": {op: oid}}]}
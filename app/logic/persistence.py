@@ -0,0 +1,20 @@
+from typing import Optional
+from pymongo import ReturnDocument
+
+from app.db import db
+
+async def insert_document(collection: str, doc: dict) -> dict:
+    """Insert a document and return it as stored, without reading it back."""
+    result = await db.get_collection(collection).insert_one(doc)
+    doc["_id"] = result.inserted_id
+    return doc
+
+async def update_document(collection: str, query: dict, update: dict, upsert: bool = False, projection: Optional[dict] = None) -> Optional[dict]:
+    """Apply an update and return the document after it in a single round trip."""
+    return await db.get_collection(collection).find_one_and_update(
+        query,
+        update,
+        projection=projection,
+        upsert=upsert,
+        return_document=ReturnDocument.AFTER
+    )
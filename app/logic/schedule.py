@@ -0,0 +1,99 @@
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+MINUTES_PER_DAY = 24 * 60
+
+Interval = Tuple[datetime, datetime]
+HoursKey = Tuple[Tuple[int, str, str], ...]
+
+@lru_cache(maxsize=None)
+def get_timezone(tz_str: str) -> ZoneInfo:
+    return ZoneInfo(tz_str)
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def _minute_of_week(local: datetime) -> float:
+    return local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute + local.second / 60
+
+class CompiledSchedule:
+    """Working hours compiled to sorted, merged minute-of-week intervals.
+
+    Several entries for the same day (split shifts) are supported. Lookups are
+    a binary search over the interval starts; no strings are parsed after
+    compilation.
+    """
+
+    __slots__ = ("tz", "starts", "ends", "days")
+
+    def __init__(self, tz: ZoneInfo, intervals: Sequence[Tuple[int, int]]):
+        self.tz = tz
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+        # Per-weekday (start, end) minute-of-day pairs, used to expand dates
+        self.days: List[List[Tuple[int, int]]] = [[] for _ in range(7)]
+        for start, end in zip(self.starts, self.ends):
+            day = start // MINUTES_PER_DAY
+            self.days[day].append((start - day * MINUTES_PER_DAY, end - day * MINUTES_PER_DAY))
+
+    def contains(self, start_local: datetime, end_local: datetime) -> bool:
+        """Whether [start_local, end_local) lies inside a single working interval."""
+        start = _minute_of_week(start_local)
+        duration = (end_local.replace(tzinfo=None) - start_local.replace(tzinfo=None)).total_seconds() / 60
+        i = bisect_right(self.starts, start) - 1
+        return i >= 0 and start + duration <= self.ends[i]
+
+    def is_open(self, start_utc: datetime, end_utc: datetime) -> bool:
+        start_local = start_utc.astimezone(self.tz)
+        return self.contains(start_local, start_local + (end_utc - start_utc))
+
+    def local_intervals(self, day: date) -> List[Interval]:
+        midnight = datetime.combine(day, time(), tzinfo=self.tz)
+        return [
+            (midnight + timedelta(minutes=start), midnight + timedelta(minutes=end))
+            for start, end in self.days[day.weekday()]
+        ]
+
+    def utc_intervals(self, window_start: datetime, window_end: datetime, clip_start: bool = True) -> List[Interval]:
+        """Working intervals overlapping the window, clipped to it, in UTC.
+
+        With `clip_start=False` intervals keep their real start, so callers
+        can align slots to it.
+        """
+        intervals = []
+        day = window_start.astimezone(self.tz).date() - timedelta(days=1)
+        last_day = window_end.astimezone(self.tz).date()
+        while day <= last_day:
+            for start, end in self.local_intervals(day):
+                start = start.astimezone(timezone.utc)
+                end = min(end.astimezone(timezone.utc), window_end)
+                if clip_start:
+                    start = max(start, window_start)
+                if start < end and end > window_start:
+                    intervals.append((start, end))
+            day += timedelta(days=1)
+        return intervals
+
+@lru_cache(maxsize=4096)
+def _compile(tz_str: str, hours: HoursKey) -> CompiledSchedule:
+    return CompiledSchedule(
+        get_timezone(tz_str),
+        [
+            (day * MINUTES_PER_DAY + _minutes(start), day * MINUTES_PER_DAY + _minutes(end))
+            for day, start, end in hours
+        ]
+    )
+
+def get_schedule(working_hours: list, tz_str: str = "UTC") -> CompiledSchedule:
+    """Return the compiled schedule for a business' working hours, compiling once per distinct value."""
+    return _compile(tz_str, tuple((w["day"], w["start"], w["end"]) for w in working_hours))
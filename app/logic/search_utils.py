@@ -0,0 +1,59 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from bson import ObjectId
+
+from app.config import settings
+from app.indexes import NAME_COLLATION
+
+MIN_PHONE_DIGITS = 3
+PHONE_QUERY = re.compile(r"[\d\s()+\-.]+")
+NON_DIGITS = re.compile(r"\D")
+# Sorts after every other character under ICU collations, so q..q+MAX is a prefix range
+COLLATION_MAX = "\uffff"
+
+def normalize_phone(phone: str) -> str:
+    """Digits only, so "+971 50-123" and "97150123" match the same prefix."""
+    return NON_DIGITS.sub("", phone)
+
+def customer_search(q: str) -> Tuple[dict, str, Optional[dict]]:
+    """Filter, sort field and collation for a customer search.
+
+    Queries that look like a phone number (at least MIN_PHONE_DIGITS digits)
+    are an anchored prefix match on `phone_normalized`; anything else is a
+    case- and accent-insensitive prefix range on `name`. Both are bounded
+    index range scans.
+    """
+    q = q.strip()
+    digits = normalize_phone(q)
+    if PHONE_QUERY.fullmatch(q) and len(digits) >= MIN_PHONE_DIGITS:
+        return {"phone_normalized": {"$regex": f"^{digits}"}}, "phone_normalized", None
+    return {"name": {"$gte": q, "$lt": q + COLLATION_MAX}}, "name", NAME_COLLATION
+
+def search_window(since: Optional[datetime], until: Optional[datetime], now: datetime) -> Tuple[datetime, datetime]:
+    """The [since, until) range a message search covers.
+
+    Missing ends default to now and `search_window_days` before `until`;
+    a window wider than `search_max_window_days` raises ValueError.
+    Returned bounds are naive UTC, like the stored `ts`.
+    """
+    since, until = (
+        dt.astimezone(timezone.utc).replace(tzinfo=None) if dt and dt.tzinfo else dt
+        for dt in (since, until)
+    )
+    until = until or now
+    since = since or until - timedelta(days=settings.search_window_days)
+    if since >= until:
+        raise ValueError("since must be before until")
+    if until - since > timedelta(days=settings.search_max_window_days):
+        raise ValueError(f"Search at most {settings.search_max_window_days} days at a time")
+    return since, until
+
+def message_search(business_id: str, q: str, since: datetime, until: datetime) -> dict:
+    """Text search over one business's messages in [since, until) (whole words, Arabic or English).
+
+    `ts` is a suffix of the text index, so the window is applied while
+    scanning index entries and only matches inside it are fetched and sorted.
+    """
+    return {"business_id": ObjectId(business_id), "$text": {"$search": q}, "ts": {"$gte": since, "$lt": until}}
@@ -0,0 +1,34 @@
+from functools import lru_cache
+from typing import Iterable, List, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+@lru_cache(maxsize=None)
+def _adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def model_json(model: Type[BaseModel], doc: dict) -> bytes:
+    """Validate a stored document as `model` and serialise it to JSON bytes."""
+    adapter = _adapter(model)
+    return adapter.dump_json(adapter.validate_python(doc), by_alias=True)
+
+def json_response(model: Type[BaseModel], doc: dict) -> Response:
+    return Response(model_json(model, doc), media_type="application/json")
+
+def json_list_response(model: Type[BaseModel], docs: Iterable[dict]) -> Response:
+    """Validate and serialise stored documents as a JSON array.
+
+    The whole list goes through pydantic-core in one validate and one
+    dump_json call. Returning a Response bypasses FastAPI's second
+    `response_model` validation and its generic encoder; the route's
+    `response_model` still documents the schema. Bulk validation is faster
+    than `model_construct`, which runs in Python once per document.
+    """
+    adapter = _list_adapter(model)
+    items = adapter.validate_python(docs if isinstance(docs, list) else list(docs))
+    return Response(adapter.dump_json(items, by_alias=True), media_type="application/json")
@@ -0,0 +1,35 @@
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+STREAM_BATCH_SIZE = 500
+
+async def iter_batches(cursor, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+    """Iterate a Motor cursor in lists of at most `batch_size` documents."""
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def ndjson_response(
+    cursor,
+    serialize: Callable[[dict], bytes],
+    prepare: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> StreamingResponse:
+    """Stream a cursor as newline-delimited JSON, one batch in memory at a time.
+
+    `prepare` may enrich each batch in place (e.g. with one `$in` lookup)
+    before its documents are serialised.
+    """
+    async def body():
+        async for batch in iter_batches(cursor, batch_size):
+            if prepare is not None:
+                await prepare(batch)
+            yield b"".join(serialize(doc) + b"\n" for doc in batch)
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from app.db import db
+
+async def load_checkpoint(name: str) -> Optional[Any]:
+    """Return the last processed _id recorded for a migration, if any."""
+    doc = await db.get_collection("migrations").find_one({"_id": name})
+    if doc and not doc.get("completed_at"):
+        return doc.get("last_id")
+    return None
+
+async def save_checkpoint(name: str, last_id: Any, processed: int) -> None:
+    await db.get_collection("migrations").update_one(
+        {"_id": name},
+        {
+            "$set": {"last_id": last_id, "updated_at": datetime.utcnow()},
+            "$inc": {"processed": processed},
+            "$unset": {"completed_at": ""}
+        },
+        upsert=True
+    )
+
+async def mark_completed(name: str) -> None:
+    await db.get_collection("migrations").update_one(
+        {"_id": name},
+        {"$set": {"completed_at": datetime.utcnow()}},
+        upsert=True
+    )
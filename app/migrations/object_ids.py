@@ -0,0 +1,87 @@
+"""Convert foreign keys stored as hex strings into native ObjectIds.
+
+Run with `python -m app.migrations.object_ids`. Collections are processed in
+`_id` order in batches of unordered bulk writes; the last converted `_id` is
+checkpointed per collection, so an interrupted run resumes where it stopped
+and documents written meanwhile by older workers are picked up on re-run.
+"""
+import argparse
+import asyncio
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.db import db
+from app.migrations.checkpoint import load_checkpoint, save_checkpoint, mark_completed
+
+FIELDS: Dict[str, List[str]] = {
+    "bookings": ["business_id", "customer_id", "service_id"],
+    "services": ["business_id"],
+    "slot_locks": ["business_id"],
+}
+
+def _conversion(doc: dict, fields: List[str]) -> dict:
+    return {
+        field: ObjectId(doc[field])
+        for field in fields
+        if isinstance(doc.get(field), str) and ObjectId.is_valid(doc[field])
+    }
+
+async def migrate_collection(name: str, fields: List[str], batch_size: int) -> int:
+    checkpoint = f"object_ids:{name}"
+    collection = db.get_collection(name)
+    last_id = await load_checkpoint(checkpoint)
+    converted = 0
+    while True:
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query, {field: 1 for field in fields}) \
+            .sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        ops = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": update})
+            for doc in batch
+            if (update := _conversion(doc, fields))
+        ]
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+        converted += len(ops)
+        last_id = batch[-1]["_id"]
+        await save_checkpoint(checkpoint, last_id, len(batch))
+        print(f"{name}: converted {converted} documents, last _id {last_id}")
+    await mark_completed(checkpoint)
+    return converted
+
+async def complete_if_empty() -> bool:
+    """Record the migration as completed on a database with nothing to convert.
+
+    A fresh install never runs this migration; without its checkpoints the
+    workers would keep matching foreign keys in both forms.
+    """
+    for name in FIELDS:
+        if await db.get_collection(name).find_one({}, {"_id": 1}):
+            return False
+    for name in FIELDS:
+        await mark_completed(f"object_ids:{name}")
+    return True
+
+async def run(batch_size: int = 500) -> None:
+    for name, fields in FIELDS.items():
+        await migrate_collection(name, fields, batch_size)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    await db.connect_db()
+    try:
+        await run(args.batch_size)
+    finally:
+        await db.close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""Backfill `phone_normalized` on customers for phone-prefix search.
+
+Run with `python -m app.migrations.phone_normalized`, after
+`python -m app.indexes apply`. Customers are processed in `_id` order in
+unordered bulk writes and the last `_id` is checkpointed, so an interrupted
+run resumes where it stopped. Customers written since the search release
+already carry the field.
+"""
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.db import db
+from app.logic.search_utils import normalize_phone
+from app.migrations.checkpoint import load_checkpoint, save_checkpoint, mark_completed
+
+NAME = "phone_normalized"
+
+async def run(batch_size: int = 1000) -> None:
+    collection = db.get_collection("customers")
+    last_id = await load_checkpoint(NAME)
+    updated = 0
+    while True:
+        query = {"phone_normalized": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query, {"phone": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        await collection.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"phone_normalized": normalize_phone(doc.get("phone") or "")}})
+            for doc in batch
+        ], ordered=False)
+        updated += len(batch)
+        last_id = batch[-1]["_id"]
+        await save_checkpoint(NAME, last_id, len(batch))
+        print(f"Normalised {updated} phone numbers, last _id {last_id}")
+    await mark_completed(NAME)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    await db.connect_db()
+    try:
+        await run(args.batch_size)
+    finally:
+        await db.close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
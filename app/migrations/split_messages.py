@@ -0,0 +1,67 @@
+"""Move messages embedded in conversation documents into the `messages` collection.
+
+Run with `python -m app.migrations.split_messages`. The migration is
+resumable: progress is checkpointed per batch in the `migrations` collection,
+and re-processing a conversation replaces the messages it already copied.
+Readers only page the `messages` collection, so messages still embedded in
+a conversation are not shown until this has run.
+"""
+import argparse
+import asyncio
+
+from app.db import db
+from app.migrations.checkpoint import load_checkpoint, save_checkpoint, mark_completed
+
+NAME = "split_messages"
+
+async def migrate_conversation(conv: dict) -> int:
+    messages = conv.get("messages") or []
+    if messages:
+        # Clear copies left behind by an interrupted run before re-inserting
+        await db.get_collection("messages").delete_many({"migrated_from": conv["_id"]})
+        await db.get_collection("messages").insert_many([
+            {
+                "business_id": conv["business_id"],
+                "customer_id": conv["customer_id"],
+                "migrated_from": conv["_id"],
+                **msg
+            }
+            for msg in messages
+        ])
+    update = {"$unset": {"messages": ""}, "$inc": {"message_count": len(messages)}}
+    if messages:
+        update["$max"] = {"last_message_at": max(msg["ts"] for msg in messages)}
+    await db.get_collection("conversations").update_one({"_id": conv["_id"]}, update)
+    return len(messages)
+
+async def run(batch_size: int = 100) -> None:
+    collection = db.get_collection("conversations")
+    last_id = await load_checkpoint(NAME)
+    while True:
+        query = {"messages": {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        moved = 0
+        for conv in batch:
+            moved += await migrate_conversation(conv)
+        last_id = batch[-1]["_id"]
+        await save_checkpoint(NAME, last_id, len(batch))
+        print(f"Migrated {len(batch)} conversations ({moved} messages), last _id {last_id}")
+    await mark_completed(NAME)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    await db.connect_db()
+    try:
+        await run(args.batch_size)
+    finally:
+        await db.close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
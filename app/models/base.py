@@ -1,10 +1,17 @@
-from typing import Any
+from typing import Any, Literal, Optional
 from bson import ObjectId
-from pydantic import GetJsonSchemaHandler
+from pydantic import BaseModel, GetJsonSchemaHandler
 from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import CoreSchema, core_schema
 
 class PyObjectId(ObjectId):
+    """ObjectId field type shared by all models.
+
+    Accepts ObjectIds or their 24-character hex strings, keeps native
+    ObjectIds in Python (so `model_dump()` output is stored as 12-byte
+    ObjectIds) and serialises to a string in JSON.
+    """
+
     @classmethod
     def __get_validators__(cls):
         yield cls.validate
@@ -21,16 +28,24 @@ class PyObjectId(ObjectId):
         _source_type: Any,
         _handler: GetJsonSchemaHandler,
     ) -> CoreSchema:
+        from_str = core_schema.chain_schema([
+            core_schema.str_schema(),
+            core_schema.no_info_plain_validator_function(cls.validate),
+        ])
         return core_schema.json_or_python_schema(
-            json_schema=core_schema.str_schema(),
+            json_schema=from_str,
             python_schema=core_schema.union_schema([
                 core_schema.is_instance_schema(ObjectId),
-                core_schema.chain_schema([
-                    core_schema.str_schema(),
-                    core_schema.no_info_plain_validator_function(cls.validate),
-                ])
+                from_str,
             ]),
             serialization=core_schema.plain_serializer_function_ser_schema(
-                lambda x: str(x)
+                str,
+                when_used="json"
             ),
-        ) 
\ No newline at end of file
+        ) 
+
+class BulkRowResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "error"]
+    id: Optional[str] = None
+    detail: Optional[str] = None
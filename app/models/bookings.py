@@ -1,28 +1,10 @@
-from typing import Optional, Literal, Any
-from datetime import datetime
+from typing import List, Optional, Literal
+from datetime import date, datetime
 from pydantic import BaseModel, Field
-from pydantic_core import CoreSchema, core_schema
-from bson import ObjectId
-
-class PyObjectId(str):
-    @classmethod
-    def __get_pydantic_core_schema__(cls, _source_type: Any, _handler: CoreSchema) -> CoreSchema:
-        return core_schema.union_schema([
-            core_schema.str_schema(),
-            core_schema.is_instance_schema(ObjectId),
-        ])
-
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if isinstance(v, ObjectId):
-            return str(v)
-        if isinstance(v, str):
-            return v
-        raise ValueError("Invalid ObjectId")
+
+from app.models.base import PyObjectId
+
+BookingStatus = Literal["confirmed", "cancelled", "rescheduled", "completed", "no_show"]
 
 class BookingBase(BaseModel):
     business_id: PyObjectId
@@ -30,15 +12,11 @@ class BookingBase(BaseModel):
     service_id: PyObjectId
     start_time: datetime  # UTC, timezone-aware
 
-    model_config = {"json_encoders": {ObjectId: str}}
-
 class BookingCreate(BookingBase):
     pass
 
 class BookingUpdate(BaseModel):
-    status: Literal["confirmed", "cancelled", "rescheduled", "completed", "no_show"]
-
-    model_config = {"json_encoders": {ObjectId: str}}
+    status: BookingStatus
 
 class BookingInDB(BookingBase):
     id: PyObjectId = Field(alias="_id")
@@ -47,13 +25,47 @@ class BookingInDB(BookingBase):
     created_via: Literal["ai", "admin"]
     created_at: datetime
     updated_at: Optional[datetime] = None
+    checked_in_at: Optional[datetime] = None
 
-    model_config = {
-        "populate_by_name": True,
-        "json_encoders": {ObjectId: str}
-    }
+    model_config = {"populate_by_name": True}
 
 class BookingResponse(BookingInDB):
     id: str
 
-    model_config = {"populate_by_name": True, "validate_assignment": True} 
\ No newline at end of file
+    model_config = {"populate_by_name": True, "validate_assignment": True} 
+
+class AvailabilitySlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+class AvailabilityResponse(BaseModel):
+    business_id: str
+    service_id: str
+    duration_minutes: int
+    slots: List[AvailabilitySlot]
+
+class BookingImport(BookingCreate):
+    status: BookingStatus = "confirmed"
+    created_via: Literal["ai", "admin"] = "admin"
+
+class CalendarHour(BaseModel):
+    hour: int
+    count: int
+    booked_minutes: int
+    open_minutes: int
+    occupancy: float
+
+class CalendarDay(BaseModel):
+    date: date
+    count: int
+    booked_minutes: int
+    open_minutes: int
+    occupancy: float
+    hours: List[CalendarHour]
+
+class CalendarResponse(BaseModel):
+    business_id: str
+    timezone: str
+    start: date
+    end: date
+    days: List[CalendarDay]
@@ -1,27 +1,24 @@
 from datetime import datetime
-from typing import List, Literal
-from pydantic import BaseModel, Field, validator
-from bson import ObjectId
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator
 
 from app.models.base import PyObjectId
+from app.models.customers import CustomerCreate
 
 class Message(BaseModel):
     dir: Literal["in", "out"]
     text: str
     ts: datetime
+    # Provider's message id (e.g. Twilio MessageSid); redeliveries with the same id are ignored
+    provider_message_id: Optional[str] = None
 
-    @validator('text')
+    @field_validator('text')
+    @classmethod
     def text_must_not_be_empty(cls, v):
         if not v.strip():
             raise ValueError('text must not be empty')
         return v.strip()
 
-    @validator('ts')
-    def validate_datetime(cls, v):
-        if not isinstance(v, datetime):
-            raise ValueError('ts must be a valid datetime')
-        return v
-
 class ConversationBase(BaseModel):
     business_id: PyObjectId
     customer_id: PyObjectId
@@ -29,12 +26,56 @@ class ConversationBase(BaseModel):
 class ConversationInDB(ConversationBase):
     id: PyObjectId = Field(default_factory=PyObjectId)
     messages: List[Message] = Field(default_factory=list)
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
 
-    class Config:
-        json_encoders = {ObjectId: str}
-        populate_by_name = True
+    model_config = {"populate_by_name": True}
 
 class ConversationResponse(ConversationInDB):
-    class Config:
-        json_encoders = {ObjectId: str}
-        populate_by_name = True 
\ No newline at end of file
+    pass
+
+class ConversationPage(ConversationResponse):
+    has_more: bool = False
+    # Pass as `cursor` (with the same before/after) to get the next page
+    next_cursor: Optional[str] = None
+
+class ConversationSummary(ConversationBase):
+    id: PyObjectId
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
+
+    model_config = {"populate_by_name": True}
+
+class MessageSearchHit(Message):
+    customer_id: PyObjectId
+
+class MessageAppendResponse(BaseModel):
+    # conversation_id and message_count are unknown while a message is only queued
+    conversation_id: Optional[PyObjectId] = None
+    message: Message
+    message_count: Optional[int] = None
+    duplicate: bool = False
+    queued: bool = False
+
+class InboundMessage(BaseModel):
+    business_whatsapp_number: str
+    customer: CustomerCreate
+    message: Message
+
+class InboundResponse(BaseModel):
+    customer_id: PyObjectId
+    message: Message
+
+class NextBooking(BaseModel):
+    booking_id: PyObjectId
+    service_id: PyObjectId
+    start_time: datetime
+    end_time: datetime
+
+class ConversationContext(ConversationBase):
+    conversation_id: PyObjectId
+    language: Optional[Literal["ar", "en"]] = None
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
+    recent_messages: List[Message] = Field(default_factory=list)
+    next_booking: Optional[NextBooking] = None
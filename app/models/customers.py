@@ -1,22 +1,8 @@
 from datetime import datetime
-from typing import Optional, Literal, Any, Dict
+from typing import Optional, Literal
 from pydantic import BaseModel, Field
-from bson import ObjectId
 
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema: Dict[str, Any]) -> None:
-        field_schema.update(type="string")
+from app.models.base import PyObjectId
 
 class CustomerBase(BaseModel):
     whatsapp_id: str = Field(..., description="Twilio's unique conversation ID")
@@ -31,14 +17,10 @@ class CustomerInDB(CustomerBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-    class Config:
-        validate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = {"validate_by_name": True}
 
 class CustomerResponse(CustomerInDB):
     id: str = Field(alias="_id")
 
-    class Config:
-        validate_by_name = True
-        json_encoders = {ObjectId: str} 
\ No newline at end of file
+    model_config = {"validate_by_name": True}
+ 
\ No newline at end of file
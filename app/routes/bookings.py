@@ -1,11 +1,31 @@
 from fastapi import APIRouter, HTTPException, Query
 from bson import ObjectId
-from datetime import datetime, timedelta
-import pytz
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Optional
+import logging
 
-from app.models.bookings import BookingCreate, BookingResponse, BookingUpdate
+from app.models.base import BulkRowResult
+from app.models.bookings import (
+    BookingCreate, BookingResponse, BookingUpdate, BookingImport, BookingStatus,
+    AvailabilityResponse, AvailabilitySlot, CalendarResponse
+)
 from app.db import db
-from app.logic.booking_utils import get_service_duration, get_business, to_local, within_working_hours, overlap_exists
+from app.logic.booking_utils import get_service_duration, get_business, overlap_exists, reserve_slot, release_slot
+from app.logic.availability import as_utc, load_slot_index, working_intervals, free_slots
+from app.logic.calendar_utils import load_calendar
+from app.logic.conversation_utils import note_bookings, refresh_next_booking
+from app.logic.import_utils import import_bookings, MAX_BULK_ROWS
+from app.logic.legacy_ids import match_id
+from app.logic.pagination import after_cursor, encode_cursor
+from app.logic.persistence import insert_document, update_document
+from app.logic.schedule import get_schedule, get_timezone
+from app.logic.serialization import json_list_response, model_json
+from app.logic.streaming import ndjson_response
+
+MAX_AVAILABILITY_WINDOW = timedelta(days=31)
+MAX_CALENDAR_WINDOW = timedelta(days=62)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 
@@ -22,11 +42,10 @@ async def create_booking(booking: BookingCreate, created_via: str = "admin"):
         raise HTTPException(status_code=404, detail="Service not found")
 
     start_utc = booking.start_time
-    tz_str = biz["timezone"]
-    start_local = to_local(start_utc, tz_str)
-    end_local = start_local + timedelta(minutes=duration)
+    schedule = get_schedule(biz["working_hours"], biz["timezone"])
 
-    if not within_working_hours(start_local, end_local, biz["working_hours"]):
+    if not schedule.is_open(as_utc(start_utc), as_utc(start_utc) + timedelta(minutes=duration)):
+        logger.debug("Rejected booking at %s for business %s: outside working hours", start_utc, booking.business_id)
         raise HTTPException(status_code=400, detail="Outside business working hours")
 
     buffer = biz.get("buffer_minutes", 0)
@@ -34,33 +53,161 @@ async def create_booking(booking: BookingCreate, created_via: str = "admin"):
     window_end = (start_utc + timedelta(minutes=duration)) + timedelta(minutes=buffer)
 
     if await overlap_exists(booking.business_id, window_start, window_end):
+        logger.debug("Rejected booking at %s for business %s: overlaps a confirmed booking", start_utc, booking.business_id)
+        raise HTTPException(status_code=409, detail="Time slot not available")
+
+    # The check above covers bookings made before slot locks existed; the
+    # reservation is what makes concurrent requests for the same slot safe
+    booking_id = ObjectId()
+    end_utc = start_utc + timedelta(minutes=duration)
+    if not await reserve_slot(booking.business_id, booking_id, start_utc, end_utc, buffer):
         raise HTTPException(status_code=409, detail="Time slot not available")
 
     now = datetime.utcnow()
     booking_doc = booking.model_dump(by_alias=True)
     booking_doc.update({
-        "end_time": start_utc + timedelta(minutes=duration),
+        "_id": booking_id,
+        "end_time": end_utc,
         "status": "confirmed",
         "created_via": created_via,
         "created_at": now,
         "updated_at": now
     })
-    result = await db.get_collection("bookings").insert_one(booking_doc)
-    doc = await db.get_collection("bookings").find_one({"_id": result.inserted_id})
+    try:
+        doc = await insert_document("bookings", booking_doc)
+    except Exception:
+        await release_slot(booking_id)
+        raise
+    await note_bookings([doc])
     doc["id"] = str(doc.pop("_id"))
     return BookingResponse(**doc)
 
+@router.post("/bulk", response_model=List[BulkRowResult])
+async def bulk_create_bookings(bookings: List[BookingImport]):
+    if len(bookings) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} bookings per request")
+    return await import_bookings(bookings)
+
 @router.get("/", response_model=list[BookingResponse])
-async def list_bookings(business_id: str = Query(...)):
-    if not await db.get_collection("businesses").find_one({"_id": ObjectId(business_id)}):
+async def list_bookings(
+    business_id: str = Query(...),
+    start: Optional[datetime] = Query(None, description="Only bookings starting at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only bookings starting before this time"),
+    status: Optional[List[BookingStatus]] = Query(None, description="Only bookings with these statuses"),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    stream: Optional[Literal["ndjson"]] = Query(None, description="Stream all matching results as NDJSON")
+):
+    try:
+        await get_business(business_id)
+    except ValueError:
         raise HTTPException(status_code=404, detail="Business not found")
 
-    cursor = db.get_collection("bookings").find({"business_id": business_id}).sort("start_time", 1)
-    results = []
-    async for b in cursor:
+    query = {"business_id": await match_id(business_id)}
+    start_range = {}
+    if start is not None:
+        start_range["$gte"] = start
+    if end is not None:
+        start_range["$lt"] = end
+    if start_range:
+        query["start_time"] = start_range
+    if status:
+        query["status"] = {"$in": status}
+
+    collection = db.get_collection("bookings", read_profile="list")
+    if stream:
+        return ndjson_response(collection.find(query).sort([("start_time", 1), ("_id", 1)]), _serialize_booking)
+
+    if cursor:
+        try:
+            query = {"$and": [query, after_cursor("start_time", cursor)]}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # One extra row tells whether there is a next page
+    results = await collection.find(query).sort([("start_time", 1), ("_id", 1)]).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_cursor(results[-1]["start_time"], results[-1]["_id"])
+    for b in results:
         b["id"] = str(b.pop("_id"))
-        results.append(BookingResponse(**b))
-    return results
+
+    response = json_list_response(BookingResponse, results)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+@router.get("/calendar", response_model=CalendarResponse)
+async def get_calendar(
+    business_id: str = Query(...),
+    start: Optional[date] = Query(None, description="First local date, defaults to today in the business timezone"),
+    end: Optional[date] = Query(None, description="Local date after the last one shown, defaults to start + 7 days"),
+    status: List[BookingStatus] = Query(["confirmed"], description="Statuses to count")
+):
+    try:
+        biz = await get_business(business_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Business not found")
+
+    start = start or datetime.now(get_timezone(biz["timezone"])).date()
+    end = end or start + timedelta(days=7)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > MAX_CALENDAR_WINDOW:
+        raise HTTPException(status_code=400, detail="Calendar window is limited to 62 days")
+
+    return CalendarResponse(
+        business_id=business_id,
+        timezone=biz["timezone"],
+        start=start,
+        end=end,
+        days=await load_calendar(biz, start, end, status)
+    )
+
+@router.get("/availability", response_model=AvailabilityResponse)
+async def get_availability(
+    business_id: str = Query(...),
+    service_id: str = Query(...),
+    start: Optional[datetime] = Query(None, description="UTC window start, defaults to now"),
+    end: Optional[datetime] = Query(None, description="UTC window end, defaults to start + 7 days"),
+    step_minutes: int = Query(15, ge=5, le=120),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    try:
+        biz = await get_business(business_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Business not found")
+
+    try:
+        duration = await get_service_duration(service_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    now = datetime.now(timezone.utc)
+    window_start = max(as_utc(start), now) if start else now
+    window_end = as_utc(end) if end else window_start + timedelta(days=7)
+    if window_end <= window_start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if window_end - window_start > MAX_AVAILABILITY_WINDOW:
+        raise HTTPException(status_code=400, detail="Availability window is limited to 31 days")
+
+    slots = []
+    if biz.get("accepting_bookings", True):
+        index = await load_slot_index(business_id, window_start, window_end, biz.get("buffer_minutes", 0))
+        work = working_intervals(window_start, window_end, biz["timezone"], biz["working_hours"])
+        slots = free_slots(index, work, duration, step_minutes, limit, not_before=window_start)
+
+    return AvailabilityResponse(
+        business_id=business_id,
+        service_id=service_id,
+        duration_minutes=duration,
+        slots=[AvailabilitySlot(start_time=s, end_time=e) for s, e in slots]
+    )
+
+def _serialize_booking(b: dict) -> bytes:
+    b["id"] = str(b.pop("_id"))
+    return model_json(BookingResponse, b)
 
 @router.put("/{booking_id}", response_model=BookingResponse)
 async def update_booking(booking_id: str, update: BookingUpdate):
@@ -68,19 +215,51 @@ async def update_booking(booking_id: str, update: BookingUpdate):
     if not data:
         raise HTTPException(status_code=400, detail="No valid update data provided")
     data["updated_at"] = datetime.utcnow()
-    result = await db.get_collection("bookings").update_one(
-        {"_id": ObjectId(booking_id)},
-        {"$set": data}
-    )
-    if result.matched_count == 0:
+
+    if data.get("status") == "confirmed":
+        existing = await db.get_collection("bookings").find_one({"_id": ObjectId(booking_id)})
+        if existing is None:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        if existing["status"] != "confirmed":
+            # Re-confirming must win the slot back like a new booking
+            biz = await get_business(existing["business_id"])
+            buffer = biz.get("buffer_minutes", 0)
+            window_start = existing["start_time"] - timedelta(minutes=buffer)
+            window_end = existing["end_time"] + timedelta(minutes=buffer)
+            if await overlap_exists(existing["business_id"], window_start, window_end) or \
+                    not await reserve_slot(existing["business_id"], existing["_id"], existing["start_time"], existing["end_time"], buffer):
+                raise HTTPException(status_code=409, detail="Time slot not available")
+
+    doc = await update_document("bookings", {"_id": ObjectId(booking_id)}, {"$set": data})
+    if doc is None:
         raise HTTPException(status_code=404, detail="Booking not found")
-    doc = await db.get_collection("bookings").find_one({"_id": ObjectId(booking_id)})
+    if data.get("status", "confirmed") != "confirmed":
+        await release_slot(ObjectId(booking_id))
+    await refresh_next_booking(doc["business_id"], doc["customer_id"])
+    doc["id"] = str(doc.pop("_id"))
+    return BookingResponse(**doc)
+
+@router.post("/{booking_id}/check-in", response_model=BookingResponse)
+async def check_in_booking(booking_id: str):
+    now = datetime.utcnow()
+    doc = await update_document(
+        "bookings",
+        {"_id": ObjectId(booking_id), "status": "confirmed"},
+        {"$set": {"checked_in_at": now, "updated_at": now}}
+    )
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Confirmed booking not found")
     doc["id"] = str(doc.pop("_id"))
     return BookingResponse(**doc)
 
 @router.delete("/{booking_id}")
 async def delete_booking(booking_id: str):
-    result = await db.get_collection("bookings").delete_one({"_id": ObjectId(booking_id)})
-    if result.deleted_count == 0:
+    deleted = await db.get_collection("bookings").find_one_and_delete(
+        {"_id": ObjectId(booking_id)},
+        projection={"business_id": 1, "customer_id": 1}
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Booking not found")
+    await release_slot(ObjectId(booking_id))
+    await refresh_next_booking(deleted["business_id"], deleted["customer_id"])
     return {"message": "Booking deleted"} 
\ No newline at end of file
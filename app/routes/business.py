@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Literal, Optional
 from app.models.business import BusinessCreate, BusinessResponse, BusinessInDB
 from app.db import db
-from bson import ObjectId
+from app.logic.booking_utils import get_business as load_business
+from app.logic.cache import business_cache
+from app.logic.persistence import update_document
+from app.logic.serialization import json_list_response, json_response, model_json
+from app.logic.streaming import ndjson_response
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -17,58 +19,58 @@ async def create_business(business: BusinessCreate):
         # Convert Pydantic model to dict
         business_dict = business.model_dump()
         
-        # Check if business with same name exists
-        existing_business = await db.get_collection("businesses").find_one({"name": business_dict["name"]})
-        if existing_business:
-            # Update existing business
-            logger.info(f"Existing business found: {existing_business is not None}")
-            result = await db.get_collection("businesses").update_one(
-                {"_id": existing_business["_id"]},
-                {"$set": business_dict}
-            )
-            logger.info(f"Updated document: {await db.get_collection('businesses').find_one({'_id': existing_business['_id']})}")
-            
-            # Convert _id to string for response
-            business_dict["id"] = str(existing_business["_id"])
-            return BusinessResponse(**business_dict)
-        
-        # Insert new business
-        result = await db.get_collection("businesses").insert_one(business_dict)
-        
-        # Get the inserted document
-        inserted_business = await db.get_collection("businesses").find_one({"_id": result.inserted_id})
+        # Update the business with the same name, or insert it
+        saved_business = await update_document(
+            "businesses",
+            {"name": business_dict["name"]},
+            {"$set": business_dict},
+            upsert=True,
+            projection={"_id": 1}
+        )
+        business_cache.invalidate(saved_business["_id"])
+        logger.info("Saved business %s", saved_business["_id"])
         
         # Convert _id to string for response
-        business_dict["id"] = str(result.inserted_id)
+        business_dict["id"] = str(saved_business["_id"])
         return BusinessResponse(**business_dict)
         
     except Exception as e:
-        logger.error(f"Error creating business: {str(e)}")
+        logger.error("Error creating business: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/", response_model=List[BusinessResponse])
-async def get_businesses():
+async def get_businesses(
+    stream: Optional[Literal["ndjson"]] = Query(None, description="Stream results as NDJSON")
+):
     try:
+        if stream:
+            return ndjson_response(db.get_collection("businesses", read_profile="list").find(), _serialize_business)
+
         businesses = []
-        async for business in db.get_collection("businesses").find():
+        async for business in db.get_collection("businesses", read_profile="list").find():
             # Convert _id to string for response
             business["id"] = str(business.pop("_id"))
-            businesses.append(BusinessResponse(**business))
-        return businesses
+            businesses.append(business)
+        return json_list_response(BusinessResponse, businesses)
     except Exception as e:
-        logger.error(f"Error getting businesses: {str(e)}")
+        logger.error("Error getting businesses: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _serialize_business(business: dict) -> bytes:
+    business["id"] = str(business.pop("_id"))
+    return model_json(BusinessResponse, business)
+
 @router.get("/{business_id}", response_model=BusinessResponse)
 async def get_business(business_id: str):
     try:
-        business = await db.get_collection("businesses").find_one({"_id": ObjectId(business_id)})
-        if business is None:
+        try:
+            business = await load_business(business_id)
+        except ValueError:
             raise HTTPException(status_code=404, detail="Business not found")
         
         # Convert _id to string for response
         business["id"] = str(business.pop("_id"))
-        return BusinessResponse(**business)
+        return json_response(BusinessResponse, business)
     except Exception as e:
-        logger.error(f"Error getting business: {str(e)}")
+        logger.error("Error getting business: %s", e)
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -1,51 +1,193 @@
 from fastapi import APIRouter, HTTPException, Query, Body
 from bson import ObjectId
+from pymongo.errors import ExecutionTimeout
+from datetime import datetime
+from typing import List, Literal, Optional, Union
 
-from app.models.conversations import Message, ConversationResponse
-from app.logic.conversation_utils import get_conversation, add_message
+from app.models.conversations import (
+    Message, ConversationResponse, ConversationPage, ConversationSummary, MessageAppendResponse,
+    InboundMessage, InboundResponse, ConversationContext, MessageSearchHit
+)
+from app.logic.conversation_utils import (
+    WITHOUT_CONTEXT, get_context, get_conversation_page, get_messages_by_customer, recent_delivery
+)
+from app.logic.message_buffer import submit_message
+from app.config import settings
 from app.db import db
+from app.logic.pagination import after_cursor, decode_cursor, encode_cursor
+from app.logic.search_utils import message_search, search_window
+from app.logic.serialization import json_list_response, model_json
+from app.logic.streaming import ndjson_response
+from app.logic.booking_utils import get_business, get_business_by_number
+from app.logic.customer_utils import get_customer, upsert_customer
 
 router = APIRouter(prefix="/conversations", tags=["conversations"])
 
+@router.post("/inbound")
+async def ingest_inbound_message(inbound: InboundMessage) -> InboundResponse:
+    """Resolve the business and customer by WhatsApp ids and append the message in one call.
+
+    The business comes from the cache, an unchanged known customer is not
+    rewritten, and a recent redelivery is answered from memory; the usual
+    cost is the message insert and the conversation counter bump.
+    """
+    try:
+        biz = await get_business_by_number(inbound.business_whatsapp_number)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Business not found")
+    business_id = str(biz["_id"])
+
+    delivered = recent_delivery(business_id, inbound.message.provider_message_id)
+    customer = await upsert_customer(inbound.customer)
+    if delivered:
+        return InboundResponse(customer_id=customer["_id"], message=delivered["message"])
+
+    appended = await submit_message(business_id, str(customer["_id"]), inbound.message, customer.get("language"))
+    if not appended:
+        raise HTTPException(status_code=500, detail="Failed to add message to conversation")
+    return InboundResponse(customer_id=customer["_id"], message=appended["message"])
+
+@router.get("/search", response_model=List[MessageSearchHit])
+async def search_messages(
+    business_id: str = Query(...),
+    q: str = Query(..., min_length=2, description="Words to find; quote a phrase, prefix a word with - to exclude it"),
+    since: Optional[datetime] = Query(None, description="Oldest message to search; defaults to SEARCH_WINDOW_DAYS before until"),
+    until: Optional[datetime] = Query(None, description="Search messages older than this; defaults to now"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page")
+):
+    """Messages of one business containing the words within a time window, newest first.
+
+    The window bounds the matches that are sorted; older messages are found
+    by searching an earlier window.
+    """
+    try:
+        since, until = search_window(since, until, datetime.utcnow())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = message_search(business_id, q, since, until)
+    if cursor:
+        try:
+            query.update(after_cursor("ts", cursor, direction=-1))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    collection = db.get_collection("messages", read_profile="list")
+    try:
+        results = await collection.find(query) \
+            .sort([("ts", -1), ("_id", -1)]) \
+            .limit(limit + 1) \
+            .max_time_ms(settings.search_max_time_ms) \
+            .to_list(limit + 1)
+    except ExecutionTimeout:
+        raise HTTPException(status_code=504, detail="Search timed out; use more specific words or a shorter window")
+
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_cursor(results[-1]["ts"], results[-1]["_id"])
+
+    response = json_list_response(MessageSearchHit, results)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
 @router.post("/{customer_id}/add_message")
 async def add_message_to_conversation(
     customer_id: str,
     business_id: str = Query(...),
     message: Message = Body(...)
-) -> ConversationResponse:
+) -> MessageAppendResponse:
+    # Provider retry of a message this process just stored: answer without touching Mongo
+    delivered = recent_delivery(business_id, message.provider_message_id)
+    if delivered:
+        return MessageAppendResponse(**delivered)
+
     # Validate business exists
-    business = await db.get_collection("businesses").find_one({"_id": ObjectId(business_id)})
-    if not business:
+    try:
+        await get_business(business_id)
+    except ValueError:
         raise HTTPException(status_code=404, detail="Business not found")
     
     # Validate customer exists
-    customer = await db.get_collection("customers").find_one({"_id": ObjectId(customer_id)})
-    if not customer:
+    try:
+        customer = await get_customer(customer_id)
+    except ValueError:
         raise HTTPException(status_code=404, detail="Customer not found")
     
     # Add message to conversation
-    conversation = await add_message(business_id, customer_id, message)
-    if not conversation:
+    appended = await submit_message(business_id, customer_id, message, customer.get("language"))
+    if not appended:
         raise HTTPException(status_code=500, detail="Failed to add message to conversation")
-    return ConversationResponse(**conversation)
+    return MessageAppendResponse(**appended)
+
+@router.get("/{customer_id}/context")
+async def get_conversation_context(customer_id: str, business_id: str = Query(...)) -> ConversationContext:
+    """Recent messages, language and next booking for building a prompt, in one indexed read."""
+    context = await get_context(business_id, customer_id)
+    if not context:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return ConversationContext(**context)
 
 @router.get("/{customer_id}")
 async def get_customer_conversation(
     customer_id: str,
-    business_id: str = Query(...)
-) -> ConversationResponse:
-    conversation = await get_conversation(business_id, customer_id)
+    business_id: str = Query(...),
+    before: Optional[datetime] = Query(None, description="Return messages older than this timestamp"),
+    after: Optional[datetime] = Query(None, description="Return messages newer than this timestamp"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+) -> ConversationPage:
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    conversation = await get_conversation_page(business_id, customer_id, before, after, limit, cursor)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return ConversationResponse(**conversation)
+    return ConversationPage(**conversation)
 
 @router.get("/")
 async def get_business_conversations(
-    business_id: str = Query(...)
-) -> list[ConversationResponse]:
-    collection = db.get_collection("conversations")
-    conversations = await collection.find({"business_id": ObjectId(business_id)}).to_list(None)
+    business_id: str = Query(...),
+    summary: bool = Query(False, description="Omit messages and return counters only"),
+    stream: Optional[Literal["ndjson"]] = Query(None, description="Stream results as NDJSON")
+) -> Union[list[ConversationSummary], list[ConversationResponse]]:
+    collection = db.get_collection("conversations", read_profile="list")
+    if stream:
+        cursor = collection.find({"business_id": ObjectId(business_id)}, {"messages": 0, **WITHOUT_CONTEXT})
+        if summary:
+            return ndjson_response(cursor, _serialize_summary)
+
+        async def attach_messages(batch: List[dict]):
+            messages = await get_messages_by_customer(business_id, [conv["customer_id"] for conv in batch])
+            for conv in batch:
+                conv["messages"] = messages.get(conv["customer_id"], [])
+
+        return ndjson_response(cursor, _serialize_conversation, prepare=attach_messages)
+
+    if summary:
+        conversations = await collection.find(
+            {"business_id": ObjectId(business_id)},
+            {"messages": 0, **WITHOUT_CONTEXT}
+        ).to_list(None)
+        for conv in conversations:
+            conv["id"] = conv.pop("_id")
+        return json_list_response(ConversationSummary, conversations)
+
+    conversations = await collection.find({"business_id": ObjectId(business_id)}, WITHOUT_CONTEXT).to_list(None)
+    messages = await get_messages_by_customer(business_id, [conv["customer_id"] for conv in conversations])
     # Convert _id to id for each conversation
     for conv in conversations:
         conv["id"] = conv.pop("_id")
-    return [ConversationResponse(**conv) for conv in conversations] 
\ No newline at end of file
+        conv["messages"] = conv.pop("messages", []) + messages.get(conv["customer_id"], [])
+    return json_list_response(ConversationResponse, conversations)
+
+def _serialize_summary(conv: dict) -> bytes:
+    conv["id"] = conv.pop("_id")
+    return model_json(ConversationSummary, conv)
+
+def _serialize_conversation(conv: dict) -> bytes:
+    conv["id"] = conv.pop("_id")
+    return model_json(ConversationResponse, conv)
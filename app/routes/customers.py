@@ -1,43 +1,77 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Literal, Optional
+from app.models.base import BulkRowResult
 from app.models.customers import CustomerCreate, CustomerResponse
+from app.config import settings
 from app.db import db
+from app.logic.cache import customer_cache
+from app.logic.customer_utils import customer_upsert
+from app.logic.import_utils import import_customers, MAX_BULK_ROWS
+from app.logic.pagination import after_cursor, encode_cursor
+from app.logic.persistence import update_document
+from app.logic.search_utils import customer_search
+from app.logic.serialization import json_list_response, json_response, model_json
+from app.logic.streaming import ndjson_response
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import ExecutionTimeout
 
 router = APIRouter()
 
 @router.post("/", response_model=CustomerResponse)
 async def create_or_update_customer(customer: CustomerCreate):
-    # Get customers collection
-    customers_collection = db.get_collection("customers")
-    
-    # Check if customer exists
-    existing_customer = await customers_collection.find_one({"whatsapp_id": customer.whatsapp_id})
-    
-    if existing_customer:
-        # Update existing customer
-        update_data = customer.dict(exclude_unset=True)
-        await customers_collection.update_one(
-            {"whatsapp_id": customer.whatsapp_id},
-            {"$set": update_data}
-        )
-        # Fetch updated document
-        updated_customer = await customers_collection.find_one({"whatsapp_id": customer.whatsapp_id})
-        # Convert ObjectId to string
-        updated_customer["_id"] = str(updated_customer["_id"])
-        return CustomerResponse(**updated_customer)
-    else:
-        # Create new customer
-        customer_data = customer.dict()
-        customer_data["created_at"] = datetime.utcnow()
-        result = await customers_collection.insert_one(customer_data)
-        
-        # Fetch created document
-        created_customer = await customers_collection.find_one({"_id": result.inserted_id})
-        # Convert ObjectId to string
-        created_customer["_id"] = str(created_customer["_id"])
-        return CustomerResponse(**created_customer)
+    # Create the customer or update the fields it was sent with, in one round trip
+    saved_customer = await update_document(
+        "customers",
+        {"whatsapp_id": customer.whatsapp_id},
+        customer_upsert(customer, datetime.utcnow()),
+        upsert=True
+    )
+    customer_cache.invalidate(saved_customer["_id"])
+    # Convert ObjectId to string
+    saved_customer["_id"] = str(saved_customer["_id"])
+    return CustomerResponse(**saved_customer)
+
+@router.post("/bulk", response_model=List[BulkRowResult])
+async def bulk_create_or_update_customers(customers: List[CustomerCreate]):
+    if len(customers) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} customers per request")
+    return await import_customers(customers)
+
+@router.get("/search", response_model=List[CustomerResponse])
+async def search_customers(
+    q: str = Query(..., min_length=2, description="Name prefix, or at least 3 digits of a phone number"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page")
+):
+    query, sort_field, collation = customer_search(q)
+    if cursor:
+        try:
+            query.update(after_cursor(sort_field, cursor))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    collection = db.get_collection("customers", read_profile="list")
+    try:
+        results = await collection.find(query, collation=collation) \
+            .sort([(sort_field, 1), ("_id", 1)]) \
+            .limit(limit + 1) \
+            .max_time_ms(settings.search_max_time_ms) \
+            .to_list(limit + 1)
+    except ExecutionTimeout:
+        raise HTTPException(status_code=504, detail="Search timed out; use a longer query")
+
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_cursor(results[-1][sort_field], results[-1]["_id"])
+    for customer in results:
+        customer["_id"] = str(customer["_id"])
+
+    response = json_list_response(CustomerResponse, results)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 @router.get("/{whatsapp_id}", response_model=CustomerResponse)
 async def get_customer(whatsapp_id: str):
@@ -49,15 +83,24 @@ async def get_customer(whatsapp_id: str):
         raise HTTPException(status_code=404, detail="Customer not found")
     # Convert ObjectId to string
     customer["_id"] = str(customer["_id"])
-    return CustomerResponse(**customer)
+    return json_response(CustomerResponse, customer)
 
 @router.get("/", response_model=List[CustomerResponse])
-async def list_customers():
+async def list_customers(
+    stream: Optional[Literal["ndjson"]] = Query(None, description="Stream results as NDJSON")
+):
     # Get customers collection
-    customers_collection = db.get_collection("customers")
+    customers_collection = db.get_collection("customers", read_profile="list")
     
+    if stream:
+        return ndjson_response(customers_collection.find().sort("created_at", -1), _serialize_customer)
+
     customers = await customers_collection.find().sort("created_at", -1).to_list(length=None)
     # Convert ObjectId to string for each customer
     for customer in customers:
         customer["_id"] = str(customer["_id"])
-    return [CustomerResponse(**customer) for customer in customers] 
\ No newline at end of file
+    return json_list_response(CustomerResponse, customers)
+
+def _serialize_customer(customer: dict) -> bytes:
+    customer["_id"] = str(customer["_id"])
+    return model_json(CustomerResponse, customer)
@@ -2,6 +2,11 @@ from fastapi import APIRouter, HTTPException
 from typing import List
 from app.models.service import ServiceCreate, ServiceResponse, ServiceInDB, ServiceUpdate
 from app.db import db
+from app.logic.booking_utils import get_business
+from app.logic.cache import service_cache
+from app.logic.legacy_ids import match_id
+from app.logic.persistence import insert_document, update_document
+from app.logic.serialization import json_list_response
 from bson import ObjectId
 import logging
 
@@ -15,40 +20,39 @@ async def create_service(service: ServiceCreate):
         service_dict = service.model_dump()
         
         # Verify business exists
-        business = await db.get_collection("businesses").find_one({"_id": ObjectId(service_dict["business_id"])})
-        if not business:
+        try:
+            await get_business(service_dict["business_id"])
+        except ValueError:
             raise HTTPException(status_code=404, detail="Business not found")
         
         # Insert service
-        result = await db.get_collection("services").insert_one(service_dict)
-        
-        # Get the inserted document
-        inserted_service = await db.get_collection("services").find_one({"_id": result.inserted_id})
+        inserted_service = await insert_document("services", service_dict)
         
         # Convert _id to string for response
         inserted_service["id"] = str(inserted_service.pop("_id"))
         return ServiceResponse(**inserted_service)
         
     except Exception as e:
-        logger.error(f"Error creating service: {str(e)}")
+        logger.error("Error creating service: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/", response_model=List[ServiceResponse])
 async def get_services(business_id: str):
     try:
         # Verify business exists
-        business = await db.get_collection("businesses").find_one({"_id": ObjectId(business_id)})
-        if not business:
+        try:
+            await get_business(business_id)
+        except ValueError:
             raise HTTPException(status_code=404, detail="Business not found")
             
         services = []
-        async for service in db.get_collection("services").find({"business_id": business_id}):
+        async for service in db.get_collection("services").find({"business_id": await match_id(business_id)}):
             # Convert _id to string for response
             service["id"] = str(service.pop("_id"))
-            services.append(ServiceResponse(**service))
-        return services
+            services.append(service)
+        return json_list_response(ServiceResponse, services)
     except Exception as e:
-        logger.error(f"Error getting services: {str(e)}")
+        logger.error("Error getting services: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{service_id}", response_model=ServiceResponse)
@@ -61,29 +65,29 @@ async def update_service(service_id: str, service_update: ServiceUpdate):
             raise HTTPException(status_code=400, detail="No valid update data provided")
             
         # Update service
-        result = await db.get_collection("services").update_one(
+        updated_service = await update_document(
+            "services",
             {"_id": ObjectId(service_id)},
             {"$set": update_data}
         )
+        service_cache.invalidate(ObjectId(service_id))
         
-        if result.matched_count == 0:
+        if updated_service is None:
             raise HTTPException(status_code=404, detail="Service not found")
             
-        # Get updated service
-        updated_service = await db.get_collection("services").find_one({"_id": ObjectId(service_id)})
-        
         # Convert _id to string for response
         updated_service["id"] = str(updated_service.pop("_id"))
         return ServiceResponse(**updated_service)
         
     except Exception as e:
-        logger.error(f"Error updating service: {str(e)}")
+        logger.error("Error updating service: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{service_id}")
 async def delete_service(service_id: str):
     try:
         result = await db.get_collection("services").delete_one({"_id": ObjectId(service_id)})
+        service_cache.invalidate(ObjectId(service_id))
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Service not found")
@@ -91,5 +95,5 @@ async def delete_service(service_id: str):
         return {"message": "Service deleted successfully"}
         
     except Exception as e:
-        logger.error(f"Error deleting service: {str(e)}")
+        logger.error("Error deleting service: %s", e)
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
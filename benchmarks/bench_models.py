@@ -0,0 +1,78 @@
+"""Micro benchmarks for response model construction and serialisation.
+
+    pytest benchmarks/bench_models.py
+"""
+import json
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.models.bookings import BookingResponse
+from app.models.conversations import ConversationResponse
+from app.logic.serialization import json_list_response
+
+NOW = datetime(2030, 1, 7, 8, 0)
+
+BOOKING_DOC = {
+    "id": str(ObjectId()),
+    "business_id": ObjectId(),
+    "customer_id": ObjectId(),
+    "service_id": ObjectId(),
+    "start_time": NOW,
+    "end_time": NOW + timedelta(minutes=30),
+    "status": "confirmed",
+    "created_via": "ai",
+    "created_at": NOW,
+}
+
+def _conversation_doc(messages: int) -> dict:
+    return {
+        "id": ObjectId(),
+        "business_id": ObjectId(),
+        "customer_id": ObjectId(),
+        "messages": [
+            {"dir": "in" if i % 2 else "out", "text": f"message {i}", "ts": NOW + timedelta(seconds=i)}
+            for i in range(messages)
+        ],
+        "message_count": messages,
+        "last_message_at": NOW,
+    }
+
+CONVERSATION_DOC = _conversation_doc(50)
+
+def bench_booking_response_construct(benchmark):
+    benchmark(BookingResponse, **BOOKING_DOC)
+
+def bench_booking_response_dump_json(benchmark):
+    booking = BookingResponse(**BOOKING_DOC)
+    benchmark(booking.model_dump_json)
+
+def bench_booking_response_list_100(benchmark):
+    def build():
+        return [BookingResponse(**BOOKING_DOC).model_dump(mode="json") for _ in range(100)]
+
+    assert len(benchmark(build)) == 100
+
+def bench_conversation_response_construct(benchmark):
+    benchmark(ConversationResponse, **CONVERSATION_DOC)
+
+def bench_conversation_response_dump_json(benchmark):
+    conversation = ConversationResponse(**CONVERSATION_DOC)
+    benchmark(conversation.model_dump_json)
+
+def _booking_rows(n: int) -> list:
+    return [{**BOOKING_DOC, "id": str(ObjectId()), "start_time": NOW + timedelta(minutes=i)} for i in range(n)]
+
+def bench_list_bookings_10k_models(benchmark):
+    # Per-row model construction followed by FastAPI-style response_model re-validation
+    adapter = TypeAdapter(list[BookingResponse])
+
+    def serialize():
+        models = adapter.validate_python([BookingResponse(**row) for row in _booking_rows(10_000)])
+        return json.dumps(adapter.dump_python(models, mode="json", by_alias=True)).encode()
+
+    benchmark(serialize)
+
+def bench_list_bookings_10k_json_list_response(benchmark):
+    benchmark(lambda: json_list_response(BookingResponse, _booking_rows(10_000)).body)
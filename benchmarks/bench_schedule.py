@@ -0,0 +1,33 @@
+"""Micro benchmarks for working-hours checks and timezone conversion.
+
+    pytest benchmarks/bench_schedule.py
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.logic.booking_utils import to_local, within_working_hours
+
+WORKING_HOURS = [{"day": day, "start": "09:00", "end": "17:00"} for day in range(6)] + [
+    {"day": 2, "start": "18:00", "end": "21:00"}
+]
+START_UTC = datetime(2030, 1, 7, 8, 0, tzinfo=timezone.utc)
+
+def bench_to_local(benchmark):
+    local = benchmark(to_local, START_UTC, "Asia/Dubai")
+    assert local.hour == 12
+
+def bench_within_working_hours_open(benchmark):
+    start = to_local(START_UTC, "Asia/Dubai")
+    assert benchmark(within_working_hours, start, start + timedelta(minutes=30), WORKING_HOURS)
+
+def bench_within_working_hours_closed(benchmark):
+    start = to_local(START_UTC + timedelta(hours=6), "Asia/Dubai")
+    assert not benchmark(within_working_hours, start, start + timedelta(minutes=30), WORKING_HOURS)
+
+def bench_within_working_hours_fresh_list(benchmark):
+    # A new (equal) list per call, as when the business document is re-read
+    start = to_local(START_UTC, "Asia/Dubai")
+
+    def check():
+        return within_working_hours(start, start + timedelta(minutes=30), [dict(h) for h in WORKING_HOURS])
+
+    assert benchmark(check)
@@ -0,0 +1,45 @@
+"""Worker boot time: importing the app and running its lifespan startup.
+
+    pytest benchmarks/bench_startup.py
+
+Each round starts a fresh interpreter, as a new uvicorn worker would. Mongo
+points at a closed port: boot must not wait for the database.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_APP = "import app.main"
+
+BOOT_WORKER = """
+import asyncio
+from app.main import app
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(boot())
+"""
+
+ENV = {
+    **os.environ,
+    "MONGODB_URL": "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100",
+    "LOG_LEVEL": "WARNING",
+}
+
+def _run(code: str, env: dict = ENV) -> None:
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+
+def bench_import_app(benchmark):
+    benchmark.pedantic(_run, args=(IMPORT_APP,), rounds=5, iterations=1)
+
+def bench_boot_worker(benchmark):
+    benchmark.pedantic(_run, args=(BOOT_WORKER,), rounds=5, iterations=1)
+
+def bench_boot_worker_without_background_tasks(benchmark):
+    env = {**ENV, "CACHE_CHANGE_STREAMS": "0", "SCHEDULER_ENABLED": "0"}
+    benchmark.pedantic(_run, args=(BOOT_WORKER, env), rounds=5, iterations=1)
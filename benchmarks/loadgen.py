@@ -0,0 +1,223 @@
+"""In-process load generator for the booking and conversation hot paths.
+
+Drives the FastAPI app through httpx's ASGI transport, against
+mongomock-motor by default or a real mongod with --mongo-url:
+
+    python benchmarks/loadgen.py --requests 500 --concurrency 20
+    python benchmarks/loadgen.py --mongo-url mongodb://localhost:27017 --save benchmarks/baseline.json
+    python benchmarks/loadgen.py --compare benchmarks/baseline.json --tolerance 0.2
+
+Reports p50/p95/p99 latency and requests per second per scenario.
+`--compare` exits non-zero when any scenario's p95 or throughput is worse
+than the baseline by more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db import Database  # noqa: E402
+from app.indexes import ensure_indexes  # noqa: E402
+from app.main import app  # noqa: E402
+
+BUSINESS = {
+    "name": "Loadgen Salon",
+    "whatsapp_number": "+971500000001",
+    "timezone": "UTC",
+    "working_hours": [{"day": day, "start": "00:00", "end": "23:59"} for day in range(7)],
+    "buffer_minutes": 0,
+    "language_default": "en",
+}
+SERVICE_MINUTES = 30
+SLOTS_PER_DAY = 40
+FIRST_SLOT = datetime(2035, 1, 1, 1, 0)
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    seconds: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+async def run_scenario(
+    name: str,
+    requests: int,
+    concurrency: int,
+    call: Callable[[int], Awaitable[httpx.Response]]
+) -> ScenarioResult:
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await call(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return ScenarioResult(
+        name=name,
+        requests=requests,
+        errors=errors,
+        seconds=round(seconds, 3),
+        rps=round(requests / seconds, 1),
+        p50_ms=round(_percentile(latencies, 50) * 1000, 2),
+        p95_ms=round(_percentile(latencies, 95) * 1000, 2),
+        p99_ms=round(_percentile(latencies, 99) * 1000, 2),
+    )
+
+async def _connect(mongo_url: str) -> None:
+    if mongo_url:
+        from app.config import settings
+        object.__setattr__(settings, "mongodb_db", "hadir_loadgen")
+        await Database.connect_db(mongo_url)
+        # Start from an empty database
+        await Database.client.drop_database("hadir_loadgen")
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient(tz_aware=False)
+        Database.client = client
+        Database.db = client.hadir_loadgen
+        Database._collections = {}
+    # connect_db does not build indexes; without them every scenario measures collection scans
+    await ensure_indexes(Database.db)
+
+async def _seed(client: httpx.AsyncClient, customers: int) -> Dict[str, object]:
+    response = await client.post("/business/", json=BUSINESS)
+    response.raise_for_status()
+    business_id = response.json()["id"]
+    response = await client.post("/services/", json={
+        "business_id": business_id, "name_en": "Cut", "name_ar": "قص",
+        "duration_minutes": SERVICE_MINUTES, "price": 50,
+    })
+    response.raise_for_status()
+    service_id = response.json()["id"]
+    customer_ids = []
+    for i in range(customers):
+        response = await client.post("/customers/", json={
+            "whatsapp_id": f"loadgen-{i}", "phone": f"+97150{i:07d}", "name": f"Customer {i}", "language": "en",
+        })
+        response.raise_for_status()
+        customer_ids.append(response.json()["_id"])
+    return {"business_id": business_id, "service_id": service_id, "customer_ids": customer_ids}
+
+async def run(args) -> List[ScenarioResult]:
+    await _connect(args.mongo_url)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadgen") as client:
+        seed = await _seed(client, args.customers)
+        business_id = seed["business_id"]
+        customer_ids = seed["customer_ids"]
+
+        def create_booking(i: int):
+            # Consecutive, non-overlapping slots so every request takes the success path
+            start = FIRST_SLOT + timedelta(days=i // SLOTS_PER_DAY, minutes=SERVICE_MINUTES * (i % SLOTS_PER_DAY))
+            return client.post("/bookings/bookings/", json={
+                "business_id": business_id,
+                "customer_id": customer_ids[i % len(customer_ids)],
+                "service_id": seed["service_id"],
+                "start_time": start.isoformat() + "Z",
+            })
+
+        def append_message(i: int):
+            return client.post(
+                f"/conversations/{customer_ids[i % len(customer_ids)]}/add_message",
+                params={"business_id": business_id},
+                json={"dir": "in" if i % 2 else "out", "text": f"message {i}", "ts": datetime.utcnow().isoformat()},
+            )
+
+        scenarios = [
+            ("create_booking", create_booking),
+            ("append_message", append_message),
+            ("list_bookings", lambda i: client.get("/bookings/bookings/", params={"business_id": business_id})),
+            ("list_conversations", lambda i: client.get(
+                "/conversations/", params={"business_id": business_id, "summary": "true"}
+            )),
+            ("list_customers", lambda i: client.get("/customers/")),
+        ]
+        results = []
+        for name, call in scenarios:
+            if args.only and name not in args.only:
+                continue
+            results.append(await run_scenario(name, args.requests, args.concurrency, call))
+    await Database.close_db()
+    return results
+
+def compare(results: List[ScenarioResult], baseline_path: str, tolerance: float) -> List[str]:
+    baseline = {row["name"]: row for row in json.loads(Path(baseline_path).read_text())["results"]}
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        if result.p95_ms > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result.name}: p95 {base['p95_ms']}ms -> {result.p95_ms}ms")
+        if result.rps < base["rps"] * (1 - tolerance):
+            regressions.append(f"{result.name}: rps {base['rps']} -> {result.rps}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--mongo-url", default="", help="Use a real mongod instead of mongomock-motor")
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--save", help="Write results as a baseline JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"{'scenario':<20}{'reqs':>7}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r.name:<20}{r.requests:>7}{r.errors:>8}{r.rps:>10}{r.p50_ms:>10}{r.p95_ms:>10}{r.p99_ms:>10}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({
+            "created_at": datetime.utcnow().isoformat(),
+            "backend": "mongod" if args.mongo_url else "mongomock",
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "results": [asdict(r) for r in results],
+        }, indent=2) + "\n")
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
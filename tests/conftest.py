@@ -0,0 +1,124 @@
+"""Shared fixtures.
+
+Tests run the app against mongomock by default. Set MONGODB_TEST_URL to run
+them against a real mongod instead (each test gets a throwaway database);
+tests marked `requires_mongod` need server features and skip without it.
+"""
+import functools
+import os
+import sys
+import uuid
+from pathlib import Path
+
+# Tests import the app as a package from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.db import Database
+from app.indexes import ensure_indexes
+from app.logic import booking_utils, conversation_utils, customer_utils, legacy_ids
+from app.logic.cache import caches
+from app.logic.metrics import command_listener, current_request
+from app.main import app
+
+MONGODB_TEST_URL = os.getenv("MONGODB_TEST_URL")
+
+requires_mongod = pytest.mark.skipif(not MONGODB_TEST_URL, reason="needs a real mongod (set MONGODB_TEST_URL)")
+
+# Collection methods that are one command each. mongomock has no command
+# monitoring, so in mock mode these stand in for the CommandListener and
+# count against the request in progress, exactly as the listener does.
+MOCK_COMMANDS = (
+    "bulk_write", "count_documents", "delete_many", "delete_one", "find_one", "find_one_and_delete",
+    "find_one_and_update", "insert_many", "insert_one", "replace_one", "update_many", "update_one",
+)
+MOCK_CURSORS = ("find", "aggregate")
+
+def _count_command():
+    stats = current_request.get()
+    if stats is not None:
+        stats.mongo_ops += 1
+
+def _counted_command(method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        _count_command()
+        return await method(*args, **kwargs)
+    return wrapper
+
+def _counted_cursor(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        _count_command()
+        return method(*args, **kwargs)
+    return wrapper
+
+def _reset_caches():
+    for cache in caches.values():
+        cache.clear()
+    booking_utils.business_ids.clear()
+    customer_utils.customer_ids.clear()
+    conversation_utils.recent_deliveries.clear()
+    legacy_ids._state.update(pending=True, checked_at=0.0)
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def mongo(monkeypatch):
+    """A fresh database with every registry index, installed as the app's."""
+    if MONGODB_TEST_URL:
+        client = AsyncIOMotorClient(MONGODB_TEST_URL, event_listeners=[command_listener])
+        database = client[f"hadir_test_{uuid.uuid4().hex[:8]}"]
+    else:
+        import mongomock_motor
+        collection = mongomock_motor.AsyncMongoMockCollection
+        for name in MOCK_COMMANDS:
+            monkeypatch.setattr(collection, name, _counted_command(getattr(collection, name)))
+        for name in MOCK_CURSORS:
+            monkeypatch.setattr(collection, name, _counted_cursor(getattr(collection, name)))
+        client = AsyncMongoMockClient(tz_aware=False)
+        database = client["hadir_test"]
+    monkeypatch.setattr(Database, "client", client)
+    monkeypatch.setattr(Database, "db", database)
+    monkeypatch.setattr(Database, "_collections", {})
+    _reset_caches()
+    await ensure_indexes(database)
+    yield database
+    _reset_caches()
+    if MONGODB_TEST_URL:
+        await client.drop_database(database.name)
+        client.close()
+
+@pytest.fixture
+async def api(mongo):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+BUSINESS = {
+    "name": "Salon",
+    "whatsapp_number": "+971500000000",
+    "timezone": "Asia/Dubai",
+    "working_hours": [{"day": day, "start": "09:00", "end": "17:00"} for day in range(7)],
+    "buffer_minutes": 0,
+    "language_default": "en",
+}
+
+@pytest.fixture
+async def business(api):
+    response = await api.post("/business/", json=BUSINESS)
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.fixture
+async def service(api, business):
+    response = await api.post("/services/", json={
+        "business_id": business["id"], "name_en": "Cut", "name_ar": "قص", "duration_minutes": 30
+    })
+    assert response.status_code == 200
+    return response.json()
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.logic.availability import SlotIndex, free_slots, working_intervals
+
+pytestmark = pytest.mark.anyio
+
+WORKING_HOURS = [{"day": day, "start": "09:00", "end": "17:00"} for day in range(7)]
+# 2030-01-07 09:00-17:00 in Dubai is 05:00-13:00 UTC
+DAY = datetime(2030, 1, 7, tzinfo=timezone.utc)
+
+def _slots(window_start, window_end, index=None, step=15):
+    work = working_intervals(window_start, window_end, "Asia/Dubai", WORKING_HOURS)
+    return free_slots(index if index is not None else SlotIndex(), work, 30, step, not_before=window_start)
+
+def test_slots_align_to_working_start_with_unaligned_window():
+    window_start = DAY.replace(hour=6, minute=7, second=33, microsecond=123456)
+    slots = _slots(window_start, DAY.replace(hour=8))
+
+    assert slots[0][0] == DAY.replace(hour=6, minute=15)
+    for start, _ in slots:
+        assert start >= window_start
+        assert (start - DAY.replace(hour=5)) % timedelta(minutes=15) == timedelta(0)
+
+def test_slots_align_after_busy_interval():
+    index = SlotIndex([(DAY.replace(hour=5), DAY.replace(hour=5, minute=40))])
+    slots = _slots(DAY.replace(hour=4, minute=59, second=1), DAY.replace(hour=7), index)
+
+    assert slots[0][0] == DAY.replace(hour=5, minute=45)
+
+def test_window_before_opening_starts_at_opening():
+    slots = _slots(DAY.replace(hour=1, minute=3), DAY.replace(hour=6))
+
+    assert [s for s, _ in slots] == [DAY.replace(hour=5, minute=m) for m in (0, 15, 30)]
+
+async def test_availability_endpoint_returns_aligned_slots(api, business, service):
+    response = await api.get("/bookings/bookings/availability", params={
+        "business_id": business["id"],
+        "service_id": service["id"],
+        "start": "2030-01-07T06:07:33.123456Z",
+        "end": "2030-01-07T07:00:00Z",
+    })
+
+    assert response.status_code == 200
+    starts = [slot["start_time"] for slot in response.json()["slots"]]
+    assert starts == ["2030-01-07T06:15:00Z", "2030-01-07T06:30:00Z"]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.routes import bookings
+from conftest import BUSINESS
+
+pytestmark = pytest.mark.anyio
+
+CONCURRENT_REQUESTS = 250
+
+async def _no_overlap(*args):
+    # Every request passes the pre-check before any of them has written,
+    # as under a real race; only the slot locks can stop the double booking
+    await asyncio.sleep(0)
+    return False
+
+async def test_concurrent_bookings_for_one_slot_only_one_wins(api, mongo, business, service, monkeypatch):
+    monkeypatch.setattr(bookings, "overlap_exists", _no_overlap)
+    body = {
+        "business_id": business["id"],
+        "customer_id": business["id"],
+        "service_id": service["id"],
+        "start_time": "2030-01-07T06:00:00Z",
+    }
+
+    responses = await asyncio.gather(*(
+        api.post("/bookings/bookings/", json=body) for _ in range(CONCURRENT_REQUESTS)
+    ))
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200] + [409] * (CONCURRENT_REQUESTS - 1)
+    winner = next(r.json()["id"] for r in responses if r.status_code == 200)
+    assert await mongo.bookings.count_documents({}) == 1
+    locks = await mongo.slot_locks.find().to_list(None)
+    # 30 minutes in 5-minute cells, all held by the winner
+    assert len(locks) == 6
+    assert {str(lock["booking_id"]) for lock in locks} == {winner}
+
+async def test_availability_matches_cell_rounding_of_unaligned_bookings(api, business, service):
+    # Opening at 09:02 local (05:02 UTC) makes every 30-minute slot unaligned
+    response = await api.post("/business/", json={
+        **BUSINESS, "working_hours": [{"day": day, "start": "09:02", "end": "17:00"} for day in range(7)]
+    })
+    assert response.json()["id"] == business["id"]
+    booked = await api.post("/bookings/bookings/", json={
+        "business_id": business["id"],
+        "customer_id": business["id"],
+        "service_id": service["id"],
+        "start_time": "2030-01-07T05:02:00Z",
+    })
+    assert booked.status_code == 200
+
+    # The 05:32 neighbour shares the 05:30 lock cell, so it cannot be booked ...
+    neighbour = await api.post("/bookings/bookings/", json={
+        "business_id": business["id"],
+        "customer_id": business["id"],
+        "service_id": service["id"],
+        "start_time": "2030-01-07T05:32:00Z",
+    })
+    assert neighbour.status_code == 409
+
+    # ... and availability does not offer it; the first slot is clear of the cell
+    response = await api.get("/bookings/bookings/availability", params={
+        "business_id": business["id"],
+        "service_id": service["id"],
+        "start": "2030-01-07T05:00:00Z",
+        "end": "2030-01-07T07:00:00Z",
+        "step_minutes": 5,
+    })
+    starts = [slot["start_time"] for slot in response.json()["slots"]]
+    assert "2030-01-07T05:32:00Z" not in starts
+    assert starts[0] == "2030-01-07T05:37:00Z"
+
+    first = await api.post("/bookings/bookings/", json={
+        "business_id": business["id"],
+        "customer_id": business["id"],
+        "service_id": service["id"],
+        "start_time": starts[0],
+    })
+    assert first.status_code == 200
@@ -0,0 +1,124 @@
+"""Change events evict cached documents; without change streams the caches fall back to TTL."""
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import OperationFailure
+
+from app.db import Database
+from app.logic.cache import business_cache, customer_cache, service_cache
+from app.logic.cache_sync import CacheInvalidator
+
+pytestmark = pytest.mark.anyio
+
+CACHES = {"businesses": business_cache, "services": service_cache, "customers": customer_cache}
+
+def _change(operation: str, coll: str, _id=None) -> dict:
+    change = {"_id": {"_data": ObjectId().binary.hex()}, "operationType": operation, "ns": {"db": "hadir", "coll": coll}}
+    if _id is not None:
+        change["documentKey"] = {"_id": _id}
+    return change
+
+@pytest.fixture
+def cached():
+    """One changed and one untouched document in every cache."""
+    docs = {}
+    for name, cache in CACHES.items():
+        changed, untouched = ObjectId(), ObjectId()
+        cache.put(changed, {"_id": changed})
+        cache.put(untouched, {"_id": untouched})
+        docs[name] = (changed, untouched)
+    yield docs
+    for cache in CACHES.values():
+        cache.clear()
+
+@pytest.mark.parametrize("operation", ["insert", "update", "replace", "delete"])
+def test_document_change_evicts_only_that_document(cached, operation):
+    invalidator = CacheInvalidator()
+    for name, (changed, untouched) in cached.items():
+        invalidator.handle(_change(operation, name, changed))
+        assert CACHES[name].peek(changed) is None
+        assert CACHES[name].peek(untouched) is not None
+    assert invalidator.events == len(CACHES)
+
+def test_change_to_uncached_collection_is_ignored(cached):
+    invalidator = CacheInvalidator()
+    changed, _ = cached["businesses"]
+    invalidator.handle(_change("update", "bookings", changed))
+    assert business_cache.peek(changed) is not None
+
+@pytest.mark.parametrize("operation", ["drop", "rename", "dropDatabase", "invalidate"])
+def test_collection_level_events_clear_every_cache(cached, operation):
+    invalidator = CacheInvalidator()
+    invalidator.handle(_change(operation, "services"))
+    assert all(CACHES[name].peek(_id) is None for name, ids in cached.items() for _id in ids)
+    # Events may have been missed, so the next stream must not resume from here
+    assert invalidator._resume_token is None
+
+def test_resume_token_follows_the_last_event(cached):
+    invalidator = CacheInvalidator()
+    change = _change("update", "customers", cached["customers"][0])
+    invalidator.handle(change)
+    assert invalidator._resume_token == change["_id"]
+
+class _Stream:
+    def __init__(self, changes):
+        self.changes = changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.changes:
+            raise StopAsyncIteration
+        return self.changes.pop(0)
+
+class _ReplicaSet:
+    """A database whose change stream yields the given events, then ends."""
+
+    def __init__(self, changes):
+        self.changes = changes
+
+    def watch(self, pipeline, resume_after=None):
+        return _Stream(self.changes)
+
+async def test_watch_applies_stream_events(cached, monkeypatch):
+    changed, untouched = cached["services"]
+    monkeypatch.setattr(Database, "db", _ReplicaSet([_change("update", "services", changed)]))
+    invalidator = CacheInvalidator()
+    await invalidator._watch()
+    assert invalidator.mode == "change_stream"
+    assert (invalidator.events, service_cache.peek(changed)) == (1, None)
+    # A fresh stream (no resume token) starts from empty caches
+    assert service_cache.peek(untouched) is None
+
+async def test_falls_back_to_ttl_without_change_streams(cached, monkeypatch):
+    # mongomock, like a standalone mongod, cannot open a change stream
+    monkeypatch.setattr(Database, "db", AsyncMongoMockClient().hadir_test)
+    invalidator = CacheInvalidator()
+    invalidator.start()
+    await invalidator._task
+    assert invalidator.mode == "ttl"
+    # Nothing was evicted: the cached documents expire by TTL instead
+    changed, _ = cached["businesses"]
+    assert business_cache.peek(changed) is not None
+    await invalidator.stop()
+
+async def test_standalone_server_stops_without_retrying(monkeypatch):
+    attempts = []
+
+    async def standalone():
+        attempts.append(1)
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    invalidator = CacheInvalidator()
+    monkeypatch.setattr(invalidator, "_watch", standalone)
+    invalidator.start()
+    await invalidator._task
+    assert (invalidator.mode, len(attempts)) == ("ttl", 1)
+    await invalidator.stop()
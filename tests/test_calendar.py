@@ -0,0 +1,53 @@
+"""Booked minutes are spread over every hour a booking overlaps."""
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.logic.calendar_utils import split_by_hour
+from conftest import requires_mongod
+
+pytestmark = pytest.mark.anyio
+
+HOUR_MS = 3600 * 1000
+
+def _minutes(parts):
+    return {hour: ms // 60000 for hour, ms in parts}
+
+def test_booking_crossing_the_hour_is_split():
+    parts = split_by_hour("2030-01-07T09", 45, HOUR_MS, ZoneInfo("Asia/Dubai"))
+    assert _minutes(parts) == {"2030-01-07T09": 15, "2030-01-07T10": 45}
+
+def test_long_booking_never_fills_an_hour_twice():
+    parts = _minutes(split_by_hour("2030-01-07T09", 30, 3 * HOUR_MS, ZoneInfo("Asia/Dubai")))
+    assert parts == {"2030-01-07T09": 30, "2030-01-07T10": 60, "2030-01-07T11": 60, "2030-01-07T12": 30}
+    assert max(parts.values()) <= 60
+
+def test_half_hour_offset_timezone():
+    # Local hours in Kolkata start at :30 UTC; the split follows local hours
+    parts = split_by_hour("2030-01-07T09", 50, 20 * 60000, ZoneInfo("Asia/Kolkata"))
+    assert _minutes(parts) == {"2030-01-07T09": 10, "2030-01-07T10": 10}
+
+def test_split_across_a_dst_change():
+    # 01:30 local on the night New York springs forward: 02:00 does not exist
+    parts = _minutes(split_by_hour("2030-03-10T01", 30, HOUR_MS, ZoneInfo("America/New_York")))
+    assert parts == {"2030-03-10T01": 30, "2030-03-10T03": 30}
+    assert sum(parts.values()) == 60
+
+@requires_mongod
+async def test_calendar_occupancy_per_hour(api, business, service):
+    # 09:45-10:15 in Dubai
+    response = await api.post("/bookings/bookings/", json={
+        "business_id": business["id"], "customer_id": business["id"],
+        "service_id": service["id"], "start_time": "2030-01-07T05:45:00Z",
+    })
+    assert response.status_code == 200, response.text
+
+    response = await api.get("/bookings/bookings/calendar", params={
+        "business_id": business["id"], "start": "2030-01-07", "end": "2030-01-08",
+    })
+    assert response.status_code == 200, response.text
+    calendar = response.json()
+    hours = {h["hour"]: h for h in calendar["days"][0]["hours"]}
+    assert (hours[9]["count"], hours[9]["booked_minutes"]) == (1, 15)
+    assert (hours[10]["count"], hours[10]["booked_minutes"]) == (0, 15)
+    assert all(h["occupancy"] <= 1.0 for h in hours.values())
@@ -0,0 +1,147 @@
+"""Conversation context kept on the conversation document."""
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockCollection
+
+from app.logic import conversation_utils
+from app.logic.message_buffer import MessageBuffer
+from app.migrations import split_messages
+from app.models.conversations import Message
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def customer(api):
+    response = await api.post("/customers/", json={"whatsapp_id": "w1", "phone": "+971501234567", "language": "en"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _message(n: int) -> dict:
+    return {"dir": "in", "text": f"message {n}", "ts": f"2030-01-0{n}T10:00:00", "provider_message_id": f"SM{n}"}
+
+async def _deliver(api, business, customer, message):
+    return await api.post(
+        f"/conversations/{customer['_id']}/add_message", params={"business_id": business["id"]}, json=message
+    )
+
+async def _context(api, business, customer) -> dict:
+    response = await api.get(f"/conversations/{customer['_id']}/context", params={"business_id": business["id"]})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _assert_counted(context: dict, *numbers: int):
+    assert context["message_count"] == len(numbers)
+    assert [m["text"] for m in context["recent_messages"]] == [f"message {n}" for n in numbers]
+    assert context["last_message_at"] == _message(max(numbers))["ts"]
+
+async def test_booking_before_first_message_becomes_next_booking(api, business, service, customer):
+    booking = await api.post("/bookings/bookings/", json={
+        "business_id": business["id"],
+        "customer_id": customer["_id"],
+        "service_id": service["id"],
+        "start_time": "2030-01-07T06:00:00Z",
+    })
+    assert booking.status_code == 200, booking.text
+
+    # No conversation yet, so the booking had nowhere to be noted
+    message = {"dir": "in", "text": "hi", "ts": "2029-12-31T10:00:00Z"}
+    params = {"business_id": business["id"]}
+    response = await api.post(f"/conversations/{customer['_id']}/add_message", params=params, json=message)
+    assert response.status_code == 200, response.text
+
+    context = (await api.get(f"/conversations/{customer['_id']}/context", params=params)).json()
+    assert context["next_booking"]["booking_id"] == booking.json()["id"]
+
+async def test_redelivery_finishes_an_interrupted_append(api, business, customer, monkeypatch):
+    assert (await _deliver(api, business, customer, _message(1))).status_code == 200
+
+    # The second delivery dies between the message insert and the conversation update
+    append = conversation_utils._append_to_conversation
+
+    async def crash(*args):
+        raise RuntimeError("worker killed")
+
+    monkeypatch.setattr(conversation_utils, "_append_to_conversation", crash)
+    assert (await _deliver(api, business, customer, _message(2))).status_code == 500
+    _assert_counted(await _context(api, business, customer), 1)
+    monkeypatch.setattr(conversation_utils, "_append_to_conversation", append)
+
+    response = await _deliver(api, business, customer, _message(2))
+    assert response.status_code == 200, response.text
+    assert response.json()["message_count"] == 2
+    _assert_counted(await _context(api, business, customer), 1, 2)
+
+    # Once counted, further redeliveries change nothing
+    conversation_utils.recent_deliveries.clear()
+    response = await _deliver(api, business, customer, _message(2))
+    assert (response.json()["duplicate"], response.json()["message_count"]) == (True, 2)
+    _assert_counted(await _context(api, business, customer), 1, 2)
+
+async def test_redelivery_finishes_a_failed_group_commit(api, business, customer, monkeypatch):
+    assert (await _deliver(api, business, customer, _message(1))).status_code == 200
+
+    async def fail(self, *args, **kwargs):
+        raise RuntimeError("connection reset")
+
+    # The flush inserts both messages, then loses the conversation bulk_write
+    with monkeypatch.context() as patch:
+        patch.setattr(AsyncMongoMockCollection, "bulk_write", fail)
+        buffer = MessageBuffer(queue_size=10, batch_size=10, flush_ms=50)
+        buffer.start()
+        appends = [
+            buffer.append(business["id"], customer["_id"], Message(**_message(n))) for n in (2, 3)
+        ]
+        results = await asyncio.gather(*appends, return_exceptions=True)
+        await buffer.stop()
+    assert all(isinstance(r, HTTPException) and r.status_code == 500 for r in results)
+    _assert_counted(await _context(api, business, customer), 1)
+
+    for n in (2, 3):
+        response = await _deliver(api, business, customer, _message(n))
+        assert response.status_code == 200, response.text
+    _assert_counted(await _context(api, business, customer), 1, 2, 3)
+
+async def test_pages_do_not_lose_messages_sharing_a_timestamp(api, business, customer):
+    for n in range(1, 4):
+        message = {"dir": "in", "text": f"message {n}", "ts": "2030-01-01T10:00:00"}
+        assert (await _deliver(api, business, customer, message)).status_code == 200
+
+    for params in ({}, {"after": "2029-12-31T00:00:00"}):
+        seen, cursor = [], None
+        while True:
+            page_params = {"business_id": business["id"], "limit": 2, **params}
+            if cursor:
+                page_params["cursor"] = cursor
+            response = await api.get(f"/conversations/{customer['_id']}", params=page_params)
+            assert response.status_code == 200, response.text
+            page = response.json()
+            seen += [m["text"] for m in page["messages"]]
+            cursor = page["next_cursor"]
+            assert page["has_more"] == (cursor is not None)
+            if not cursor:
+                break
+        assert sorted(seen) == ["message 1", "message 2", "message 3"]
+
+async def test_invalid_message_cursor_is_rejected(api, business, customer):
+    response = await api.get(f"/conversations/{customer['_id']}", params={"business_id": business["id"], "cursor": "x"})
+    assert response.status_code == 400
+
+async def test_split_messages_moves_embedded_messages_into_pages(api, mongo, business, customer):
+    # A conversation written before messages moved to their own collection
+    await mongo.conversations.insert_one({
+        "business_id": ObjectId(business["id"]),
+        "customer_id": ObjectId(customer["_id"]),
+        "messages": [{"dir": "in", "text": f"message {n}", "ts": datetime(2030, 1, n, 10)} for n in (1, 2)],
+        "message_count": 0,
+    })
+    await split_messages.run()
+    await split_messages.run()
+
+    conversation = await mongo.conversations.find_one({"customer_id": ObjectId(customer["_id"])})
+    assert "messages" not in conversation and conversation["message_count"] == 2
+    response = await api.get(f"/conversations/{customer['_id']}", params={"business_id": business["id"]})
+    assert [m["text"] for m in response.json()["messages"]] == ["message 1", "message 2"]
@@ -0,0 +1,19 @@
+import pytest
+
+from app.indexes import INDEXES, QUERY_SHAPES, audit
+from conftest import requires_mongod
+
+pytestmark = pytest.mark.anyio
+
+def test_every_shape_targets_an_indexed_collection():
+    indexed = {spec.collection for spec in INDEXES}
+    assert [s.name for s in QUERY_SHAPES if s.collection not in indexed] == []
+
+def test_shape_names_are_unique():
+    names = [shape.name for shape in QUERY_SHAPES]
+    assert len(names) == len(set(names))
+
+@requires_mongod
+async def test_every_query_shape_uses_an_index(mongo):
+    # explain() of each shape on a database with exactly the registry's indexes
+    assert await audit(mongo) == {}
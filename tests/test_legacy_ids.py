@@ -0,0 +1,66 @@
+"""Bookings still keyed by hex strings stay visible until the object_ids migration completes."""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.logic import legacy_ids
+from app.migrations.checkpoint import mark_completed
+from app.migrations.object_ids import complete_if_empty
+
+pytestmark = pytest.mark.anyio
+
+async def _insert_legacy_booking(mongo, business, service):
+    # As written before the ObjectId change: foreign keys are hex strings
+    await mongo.bookings.insert_one({
+        "business_id": business["id"],
+        "customer_id": business["id"],
+        "service_id": service["id"],
+        "start_time": datetime(2030, 1, 7, 6, 0),
+        "end_time": datetime(2030, 1, 7, 6, 30),
+        "status": "confirmed",
+        "created_via": "admin",
+        "created_at": datetime(2025, 1, 1),
+    })
+
+def _booking(business, service, start):
+    return {"business_id": business["id"], "customer_id": business["id"], "service_id": service["id"], "start_time": start}
+
+async def test_string_keyed_booking_blocks_overlaps_before_migration(api, mongo, business, service):
+    await _insert_legacy_booking(mongo, business, service)
+
+    response = await api.post("/bookings/bookings/", json=_booking(business, service, "2030-01-07T06:15:00Z"))
+    assert response.status_code == 409
+
+    response = await api.get("/bookings/bookings/availability", params={
+        "business_id": business["id"], "service_id": service["id"],
+        "start": "2030-01-07T05:00:00Z", "end": "2030-01-07T08:00:00Z",
+    })
+    starts = [slot["start_time"] for slot in response.json()["slots"]]
+    assert "2030-01-07T06:00:00Z" not in starts and "2030-01-07T06:15:00Z" not in starts
+
+    response = await api.get("/bookings/bookings/", params={"business_id": business["id"]})
+    assert len(response.json()) == 1
+
+async def test_dual_reads_stop_once_every_checkpoint_completed(api, mongo, business, service):
+    assert await legacy_ids.legacy_ids_pending()
+    for name in legacy_ids.MIGRATION_CHECKPOINTS[:-1]:
+        await mark_completed(name)
+    legacy_ids._state["checked_at"] = 0.0
+    assert await legacy_ids.legacy_ids_pending()
+
+    await mark_completed(legacy_ids.MIGRATION_CHECKPOINTS[-1])
+    legacy_ids._state["checked_at"] = 0.0
+    assert not await legacy_ids.legacy_ids_pending()
+    assert legacy_ids.id_match(business["id"], False) == ObjectId(business["id"])
+
+async def test_fresh_install_records_the_migration_as_completed(mongo):
+    assert await complete_if_empty()
+    legacy_ids._state["checked_at"] = 0.0
+    assert not await legacy_ids.legacy_ids_pending()
+
+async def test_existing_data_still_needs_the_migration(mongo, business, service):
+    await _insert_legacy_booking(mongo, business, service)
+    assert not await complete_if_empty()
+    legacy_ids._state["checked_at"] = 0.0
+    assert await legacy_ids.legacy_ids_pending()
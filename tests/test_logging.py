@@ -0,0 +1,37 @@
+"""The logging queue is installed once per lifespan and fully removed when it stops."""
+import logging
+
+import pytest
+
+from app import logging_config
+from app.config import settings
+
+@pytest.fixture
+def clean_root():
+    # app.main installs the queue at import; start each test from plain logging
+    logging_config.stop_logging()
+    root = logging.getLogger()
+    yield root
+    logging_config.stop_logging()
+    logging_config.setup_logging(settings)
+
+def _queue_handlers(root):
+    return [h for h in root.handlers if isinstance(h, logging_config.LazyQueueHandler)]
+
+def test_stop_logging_restores_the_root_logger(clean_root):
+    handlers, level = list(clean_root.handlers), clean_root.level
+    logging_config.setup_logging(settings)
+    assert len(_queue_handlers(clean_root)) == 1
+
+    logging_config.stop_logging()
+    assert _queue_handlers(clean_root) == []
+    assert (clean_root.handlers, clean_root.level) == (handlers, level)
+
+def test_setup_logging_is_idempotent_across_lifespans(clean_root):
+    for _ in range(2):
+        logging_config.setup_logging(settings)
+        logging_config.setup_logging(settings)
+        assert len(_queue_handlers(clean_root)) == 1
+        assert logging_config._listener is not None
+        logging_config.stop_logging()
+        assert _queue_handlers(clean_root) == []
@@ -0,0 +1,50 @@
+"""Command byte accounting is opt-in: by default no command or reply is re-encoded."""
+import dataclasses
+from types import SimpleNamespace
+
+import bson
+import pytest
+
+from app.config import settings
+from app.logic import metrics
+
+def _events(request_id: int):
+    started = SimpleNamespace(request_id=request_id, command={"find": "bookings", "filter": {}})
+    succeeded = SimpleNamespace(
+        request_id=request_id, command_name="find", duration_micros=1000,
+        reply={"cursor": {"firstBatch": [{"_id": 1}]}, "ok": 1}
+    )
+    return started, succeeded
+
+@pytest.fixture
+def encodes(monkeypatch):
+    calls = []
+    encode = bson.encode
+    monkeypatch.setattr(metrics.bson, "encode", lambda doc: calls.append(doc) or encode(doc))
+    return calls
+
+def _run(request_id: int) -> metrics.RequestStats:
+    listener = metrics.MongoCommandListener()
+    stats = metrics.RequestStats()
+    token = metrics.current_request.set(stats)
+    try:
+        started, succeeded = _events(request_id)
+        listener.started(started)
+        listener.succeeded(succeeded)
+    finally:
+        metrics.current_request.reset(token)
+    assert listener._sent == {}
+    return stats
+
+def test_bytes_are_not_counted_by_default(encodes):
+    stats = _run(1)
+    assert (stats.mongo_ops, stats.mongo_bytes, encodes) == (1, 0, [])
+    assert "mongo_command_bytes_total" not in metrics.render_metrics()
+
+def test_bytes_are_counted_when_enabled(encodes, monkeypatch):
+    monkeypatch.setattr(metrics, "settings", dataclasses.replace(settings, metrics_command_bytes=True))
+    stats = _run(2)
+    started, succeeded = _events(2)
+    assert encodes == [started.command, succeeded.reply]
+    assert stats.mongo_bytes == len(bson.encode(started.command)) + len(bson.encode(succeeded.reply))
+    assert "mongo_command_bytes_total" in metrics.render_metrics()
@@ -0,0 +1,59 @@
+"""Mongo commands issued per mutating route, as recorded by the metrics middleware."""
+import pytest
+
+from app.logic import metrics
+from conftest import BUSINESS
+
+pytestmark = pytest.mark.anyio
+
+def _route_ops(method: str, route: str) -> float:
+    histogram = metrics._route_mongo_ops.get((method, route))
+    return histogram.sum if histogram else 0
+
+async def _ops(method: str, route: str, request):
+    before = _route_ops(method, route)
+    response = await request
+    assert response.status_code == 200, response.text
+    return int(_route_ops(method, route) - before), response.json()
+
+async def test_create_business_is_one_upsert(api, mongo):
+    ops, _ = await _ops("POST", "/business/", api.post("/business/", json=BUSINESS))
+    assert ops == 1
+
+async def test_service_writes_are_one_command_each(api, business):
+    await api.get(f"/business/{business['id']}")  # warm the business cache
+    body = {"business_id": business["id"], "name_en": "Cut", "name_ar": "قص", "duration_minutes": 30}
+
+    ops, service = await _ops("POST", "/services/", api.post("/services/", json=body))
+    assert ops == 1
+
+    ops, _ = await _ops("PUT", "/services/{service_id}", api.put(f"/services/{service['id']}", json={"price": 50}))
+    assert ops == 1
+
+async def test_customer_upsert_is_one_command(api, mongo):
+    body = {"whatsapp_id": "w1", "phone": "+971501234567", "language": "en"}
+    ops, _ = await _ops("POST", "/customers/", api.post("/customers/", json=body))
+    assert ops == 1
+
+async def test_booking_writes(api, business, service):
+    body = {
+        "business_id": business["id"],
+        "customer_id": business["id"],
+        "service_id": service["id"],
+        "start_time": "2030-01-07T06:00:00Z",
+    }
+    # Warm the business and service caches with a first booking
+    await api.post("/bookings/bookings/", json={**body, "start_time": "2030-01-08T06:00:00Z"})
+
+    # overlap check, slot locks, booking insert, conversation next_booking
+    ops, booking = await _ops("POST", "/bookings/bookings/", api.post("/bookings/bookings/", json=body))
+    assert ops == 4
+
+    route = "/bookings/bookings/{booking_id}"
+    # status update, lock release, next_booking lookup and write
+    ops, _ = await _ops("PUT", route, api.put(f"/bookings/bookings/{booking['id']}", json={"status": "cancelled"}))
+    assert ops == 4
+
+    # re-confirming also reads the booking, re-checks overlap and re-takes the locks
+    ops, _ = await _ops("PUT", route, api.put(f"/bookings/bookings/{booking['id']}", json={"status": "confirmed"}))
+    assert ops == 6
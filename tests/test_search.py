@@ -0,0 +1,37 @@
+"""Message search is always confined to a bounded time window."""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.config import settings
+from app.indexes import QUERY_SHAPES
+from app.logic.search_utils import message_search, search_window
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime(2030, 1, 7, 12, 0)
+
+def test_window_defaults_to_recent_days():
+    since, until = search_window(None, None, NOW)
+    assert until == NOW
+    assert until - since == timedelta(days=settings.search_window_days)
+
+def test_window_is_capped():
+    with pytest.raises(ValueError):
+        search_window(NOW - timedelta(days=settings.search_max_window_days + 1), NOW, NOW)
+    with pytest.raises(ValueError):
+        search_window(NOW, NOW, NOW)
+
+def test_query_matches_the_audited_shape():
+    shape = next(s for s in QUERY_SHAPES if s.name == "message search")
+    query = message_search(str(ObjectId()), "hello", *search_window(None, None, NOW))
+    assert query.keys() == shape.filter.keys()
+    assert query["ts"].keys() == shape.filter["ts"].keys()
+
+async def test_search_rejects_wide_window(api, business):
+    response = await api.get("/conversations/search", params={
+        "business_id": business["id"], "q": "hello",
+        "since": "2029-01-01T00:00:00Z", "until": "2030-01-01T00:00:00Z",
+    })
+    assert response.status_code == 400